@@ -0,0 +1,173 @@
+"""
+Benchmarks of the measurement stages and of complete runs on synthetic stacks (see pybud.synthetic).
+
+Run from the repository root:
+
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Every benchmark records the fastest of a number of repeats and the peak memory allocated while it
+runs (measured with tracemalloc). With --baseline, benchmarks that are slower or use more memory than
+the baseline by more than the tolerance are reported as regressions and the exit status is 1.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+from pybud import Cell, Ellipse, Fluorescence, PyBud
+from pybud.kernels import numba_available
+from pybud.synthetic import synthetic_stack
+
+PIXEL_SIZE = 0.0645
+CELL_RADIUS = 62    # pixels, 4 um
+EDGE_SIZE = 16      # pixels, 1 um
+EDGE_REL_MIN = 30
+
+def measure(function, repeats):
+    """
+    Time a function and record its peak memory.
+
+    Returns:
+    (fastest time in seconds, peak memory in bytes)
+    """
+    function()      # warm up caches, e.g. the ray offset table
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+def stage_benchmarks(size):
+    # benchmarks of the stages of a single cell, on a cell of a synthetic stack
+    img, cells = synthetic_stack(frames=1, height=size, width=size, n_cells=10, seed=1)
+    x, y = cells[0, 0, :2]
+
+    def create_cell(engine='vectorized', backend='numpy'):
+        return Cell(img, PIXEL_SIZE, 0, [1], 0, x, y, 1, CELL_RADIUS, EDGE_SIZE, EDGE_REL_MIN, edge_engine=engine, backend=backend)
+
+    cell = create_cell()
+    reference_cell = create_cell('reference')
+    found_x, found_y = cell.found_x[cell.pixel_found], cell.found_y[cell.pixel_found]
+    ellipse = cell.ellipse
+
+    benchmarks = {
+        'cell_edge[vectorized]': (cell.get_cell_edge, 20),
+        'cell_edge[reference]': (reference_cell.get_cell_edge, 3),
+        'ellipse[geometric]': (lambda: Ellipse(found_x, found_y, method='geometric'), 20),
+        'ellipse[algebraic]': (lambda: Ellipse(found_x, found_y, method='algebraic'), 50),
+        'fluorescence': (lambda: Fluorescence.measure_channels(img, 0, [1], ellipse), 50),
+        f'ellipse_mask[{size}x{size}]': (lambda: ellipse.get_mask(size, size), 20),
+    }
+
+    if numba_available():
+        # the kernels are compiled by the first cell, outside of the timings
+        numba_cell = create_cell(backend='numba')
+        benchmarks['cell_edge[numba]'] = (numba_cell.get_cell_edge, 20)
+        benchmarks['fluorescence[numba]'] = (lambda: Fluorescence.measure_channels(img, 0, [1], ellipse, 'numba'), 50)
+
+    return benchmarks
+
+def fit_cells_benchmarks(size, cell_counts, frame_counts, order='track'):
+    # end to end runs, every cell is selected in the first frame
+    benchmarks = {}
+    for n_cells in cell_counts:
+        for frames in frame_counts:
+            img, cells = synthetic_stack(frames=frames, height=size, width=size, n_cells=n_cells, seed=2)
+
+            def run(img=img, cells=cells):
+                pybud = PyBud()
+                pybud.img = img
+                pybud.add_selections(0, cells[0, :, :2])
+                pybud.fit_cells(order)
+
+            benchmarks[f'fit_cells[{order},cells={cells.shape[1]},frames={frames}]'] = (run, 1)
+    return benchmarks
+
+def compare(results, baseline, tolerance):
+    """
+    Print the results next to the baseline.
+
+    Returns:
+    list with the names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"{'benchmark':45s} {'time (ms)':>11s} {'baseline':>11s} {'ratio':>7s} {'memory (MB)':>12s} {'baseline':>9s}")
+
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:45s} {1e3 * result['seconds']:11.3f} {'-':>11s} {'-':>7s} {result['peak_bytes'] / 2**20:12.2f} {'-':>9s}")
+            continue
+
+        time_ratio = result['seconds'] / reference['seconds']
+        memory_ratio = result['peak_bytes'] / max(reference['peak_bytes'], 1)
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+
+        print(f"{name:45s} {1e3 * result['seconds']:11.3f} {1e3 * reference['seconds']:11.3f} {time_ratio:7.2f} "
+              f"{result['peak_bytes'] / 2**20:12.2f} {reference['peak_bytes'] / 2**20:9.2f}" + ("  REGRESSION" if regressed else ""))
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the PyBud benchmarks.')
+    parser.add_argument('-k', '--filter', default='*', help='only run the benchmarks matching this pattern')
+    parser.add_argument('--quick', action='store_true', help='smaller stacks and fewer cells and frames')
+    parser.add_argument('--save', help='write the results to this JSON file, e.g. to create a baseline')
+    parser.add_argument('--baseline', help='JSON file with baseline results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative slowdown or memory increase, timings are noisy')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        size, cell_counts, frame_counts = 256, [5], [5]
+    else:
+        size, cell_counts, frame_counts = 512, [10, 40], [5, 20]
+
+    benchmarks = stage_benchmarks(size)
+    benchmarks.update(fit_cells_benchmarks(size, cell_counts, frame_counts))
+    benchmarks.update(fit_cells_benchmarks(size, cell_counts[-1:], frame_counts[-1:], order='frame'))
+
+    results = {}
+    for name, (function, repeats) in benchmarks.items():
+        if fnmatch.fnmatch(name, args.filter):
+            seconds, peak = measure(function, repeats)
+            results[name] = {'seconds': seconds, 'peak_bytes': peak}
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'scipy': scipy.__version__,
+                'machine': platform.machine(),
+                'results': results,
+            }, file, indent=2)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
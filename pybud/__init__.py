@@ -1,10 +1,14 @@
-# __init__.py in the pybud package
-
-# Import the Cell class from cell.py
-from .cell import Cell
-from .ellipse import Ellipse
-from .fluorescence import Fluorescence
-from .pybud import PyBud
-
-# Optionally, define what gets imported when using 'from pybud import *'
-__all__ = ['Cell',  'Ellipse', 'Fluorescence', 'PyBud']
\ No newline at end of file
+# __init__.py in the pybud package
+
+# Import the Cell class from cell.py
+from .cell import Cell
+from .ellipse import Ellipse
+from .fluorescence import Fluorescence
+from .pybud import PyBud
+from .stack import TiffStack, open_stack
+from .results import ResultTable
+from .seeds import detect_seeds
+from .selections import Selections
+
+# Optionally, define what gets imported when using 'from pybud import *'
+__all__ = ['Cell',  'Ellipse', 'Fluorescence', 'PyBud', 'ResultTable', 'Selections', 'TiffStack', 'detect_seeds', 'open_stack']
\ No newline at end of file
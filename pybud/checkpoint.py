@@ -0,0 +1,115 @@
+import json
+import os
+import time
+import numpy as np
+
+class Checkpoint:
+    """
+    Progress of a fit_cells run, saved to a local .npz file so that an interrupted run can be resumed.
+
+    The file holds the result rows fitted so far, the tracks that are finished and for every
+    other started track its last fitted frame, centroid and ellipse. A resumed run skips the
+    finished tracks and continues the others after their last fitted frame.
+    The file is replaced atomically, so a crash while saving leaves the previous checkpoint intact.
+    """
+    def __init__(self, path, interval=60.0):
+        """
+        Parameters:
+        path (str): the checkpoint file
+        interval (float): minimum number of seconds between two saves of maybe_save
+        """
+        self.path = str(path)
+        self.interval = interval
+
+        self.done = set()
+        self.progress = {}      # cell_id: (last_frame, x, y, ellipse params)
+        self._last_save = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def resume(self, tracks, settings, results, n_frames):
+        """
+        Load the checkpoint, if there is one, into results and return the tracks that still
+        have to be fitted.
+
+        Parameters:
+        tracks (list): (cell_id, start_frame, x, y) tuples of the run, see PyBud.get_tracks
+        settings (dict): the measurement settings of the run, see PyBud.get_settings
+        results (ResultTable): receives the rows of the checkpoint
+        n_frames (int): number of frames in the stack
+
+        Returns:
+        list of tracks, resumed tracks are (cell_id, next_frame, x, y, ellipse params) tuples
+        """
+        self.tracks = np.array(tracks, dtype=np.float64).reshape(-1, 4)
+        self.settings = json.dumps(settings, sort_keys=True)
+
+        if not self.exists():
+            return list(tracks)
+
+        with np.load(self.path, allow_pickle=False) as data:
+            if str(data['settings']) != self.settings:
+                raise ValueError(f"The checkpoint {self.path} was written with different settings.")
+            if not np.array_equal(data['tracks'], self.tracks):
+                raise ValueError(f"The checkpoint {self.path} was written for different selections.")
+
+            self.done = set(data['done'].tolist())
+            self.progress = {int(cell_id): (int(frame), float(x), float(y), params)
+                             for cell_id, frame, x, y, params in zip(data['progress_id'], data['progress_frame'], data['progress_x'], data['progress_y'], data['progress_params'])}
+            results.append_columns({name[len('results_'):]: data[name] for name in data.files if name.startswith('results_')})
+
+        remaining = []
+        for track in tracks:
+            cell_id = track[0]
+            if cell_id in self.done:
+                continue
+            if cell_id in self.progress:
+                frame, x, y, params = self.progress[cell_id]
+                if frame + 1 >= n_frames:
+                    self.done.add(cell_id)
+                    continue
+                track = (cell_id, frame + 1, x, y, params)
+            remaining.append(track)
+
+        return remaining
+
+    def update(self, cell):
+        # record the last fitted frame of the track of a cell
+        self.progress[cell.id] = (cell.frame, cell.ellipse.get_x_center(), cell.ellipse.get_y_center(), np.asarray(cell.ellipse.params, dtype=np.float64))
+
+    def mark_done(self, cell_id):
+        self.done.add(cell_id)
+        self.progress.pop(cell_id, None)
+
+    def maybe_save(self, results):
+        # save when the last save is longer than interval seconds ago
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(results)
+
+    def save(self, results):
+        ids = sorted(self.progress)
+        arrays = {
+            'settings': np.array(self.settings),
+            'tracks': self.tracks,
+            'done': np.array(sorted(self.done), dtype=np.int64),
+            'progress_id': np.array(ids, dtype=np.int64),
+            'progress_frame': np.array([self.progress[i][0] for i in ids], dtype=np.int64),
+            'progress_x': np.array([self.progress[i][1] for i in ids], dtype=np.float64),
+            'progress_y': np.array([self.progress[i][2] for i in ids], dtype=np.float64),
+            'progress_params': np.array([self.progress[i][3] for i in ids], dtype=np.float64).reshape(-1, 5),
+        }
+        for name in results.column_names():
+            arrays[f"results_{name}"] = results[name]
+
+        # write next to the checkpoint and swap it in, so the file is never half written
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, self.path)
+
+        self._last_save = time.monotonic()
+
+    def remove(self):
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from .export import FORMATS, REQUIREMENTS, available_formats, write_results
+from .pybud import PyBud
+from .rois import read_seed_points, write_ellipse_rois
+from .stack import open_stack
+
+def read_config(path):
+    """
+    Read shared settings from a TOML or JSON file. The keys are the names of the PyBud
+    settings (see PyBud.get_settings) and max_workers.
+    """
+    if path is None:
+        return {}
+
+    if str(path).endswith('.json'):
+        with open(path) as file:
+            return json.load(file)
+
+    with open(path, 'rb') as file:
+        return tomllib.load(file)
+
+def process_stack(stack_path, points_path, output_dir, settings, max_workers=1, output_format='csv', order='track', checkpoint=False, instrument=False):
+    """
+    Fit all cells of a single stack and write the results and ROIs to output_dir.
+    When points_path is None, the seeds are detected in the first frame (see PyBud.detect_seeds).
+    With checkpoint, the progress is saved to <stack>_checkpoint.npz in output_dir while fitting,
+    an existing checkpoint is resumed and it is removed when the results have been written.
+    With instrument, the run statistics of the stack are collected (see PyBud.instrument).
+
+    Returns:
+    (stack_path, number of seeds, number of fitted cells, RunStatistics or None)
+    """
+    pybud = PyBud()
+    pybud.set_settings(settings)
+    pybud.max_workers = max_workers
+    pybud.keep_cells = False
+    pybud.instrument = instrument
+
+    stack = open_stack(stack_path)
+    pybud.img = stack
+
+    if points_path is not None:
+        n_seeds = pybud.import_selections(points_path, deduplicate=False)
+    else:
+        n_seeds = pybud.add_selections(0, pybud.detect_seeds(0))
+
+    stem = os.path.splitext(os.path.basename(stack_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, f"{stem}_checkpoint.npz") if checkpoint else None
+
+    try:
+        statistics = pybud.fit_cells(order, checkpoint_path)
+    finally:
+        stack.close()
+
+    write_results(pybud.results, os.path.join(output_dir, f"{stem}_results{FORMATS[output_format][0]}"), output_format)
+    write_ellipse_rois(pybud.results, os.path.join(output_dir, f"{stem}_rois.zip"), pybud.fitting_method)
+
+    if checkpoint_path is not None:
+        os.remove(checkpoint_path)
+
+    return stack_path, n_seeds, len(pybud.results), statistics
+
+def find_seed_points(stack_path):
+    # the default seed point file of a stack: <stack>.zip or <stack>_points.zip next to it
+    stem = os.path.splitext(stack_path)[0]
+    for candidate in [f"{stem}.zip", f"{stem}_points.zip", f"{stem}.roi"]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='pybud', description='Measure fluorescence of yeast cells in TIFF stacks without the GUI.')
+    parser.add_argument('stacks', nargs='+', help='TIFF stacks (frames, channels, height, width)')
+    parser.add_argument('-r', '--rois', nargs='+', help='ImageJ ROI zips with seed points, one per stack (default: <stack>.zip or <stack>_points.zip)')
+    parser.add_argument('-d', '--detect', action='store_true', help='detect the seeds in the first frame of every stack instead of reading them from ROI files')
+    parser.add_argument('-c', '--config', help='TOML or JSON file with the PyBud settings shared by all stacks')
+    parser.add_argument('-o', '--output-dir', help='directory for the results (default: next to each stack)')
+    parser.add_argument('-f', '--format', choices=list(FORMATS), default='csv', help='format of the result tables')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of stacks processed at the same time')
+    parser.add_argument('-w', '--workers-per-file', type=int, help='number of processes fitting the tracks of a single stack')
+    parser.add_argument('--checkpoint', action='store_true', help='save the progress while fitting and resume interrupted stacks')
+    parser.add_argument('--order', choices=['track', 'frame'], default='track', help='fit cells track by track or frame by frame')
+    parser.add_argument('-s', '--stats', action='store_true', help='print the stage timings, ray counts and track terminations of every stack')
+
+    args = parser.parse_args(argv)
+
+    if args.rois is not None and len(args.rois) != len(args.stacks):
+        parser.error("the number of ROI files must match the number of stacks")
+    if args.rois is not None and args.detect:
+        parser.error("seeds are either read from ROI files or detected")
+    if args.format not in available_formats():
+        parser.error(f"{args.format} output requires {REQUIREMENTS[args.format]}")
+    if args.jobs < 1 or (args.workers_per_file is not None and args.workers_per_file < 1):
+        parser.error("the number of jobs and workers must be at least 1")
+
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    settings = read_config(args.config)
+    max_workers = args.workers_per_file or settings.pop('max_workers', 1)
+    settings.pop('max_workers', None)
+
+    # validate the settings once, before any work is started
+    PyBud().set_settings(settings)
+
+    tasks = []
+    for i, stack_path in enumerate(args.stacks):
+        # without seed points, the seeds are detected
+        points_path = None
+        if not args.detect:
+            points_path = args.rois[i] if args.rois is not None else find_seed_points(stack_path)
+            if points_path is None:
+                print(f"{stack_path}: no seed points found, skipped", file=sys.stderr)
+                continue
+        output_dir = args.output_dir or os.path.dirname(os.path.abspath(stack_path))
+        tasks.append((stack_path, points_path, output_dir, settings, max_workers, args.format, args.order, args.checkpoint, args.stats))
+
+    failed = 0
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(tasks))) as executor:
+            futures = [executor.submit(process_stack, *task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = error
+                failed += not report(task[0], result)
+    else:
+        for task in tasks:
+            try:
+                result = process_stack(*task)
+            except Exception as error:
+                result = error
+            failed += not report(task[0], result)
+
+    return 1 if failed or len(tasks) < len(args.stacks) else 0
+
+def report(stack_path, result):
+    # print the outcome of a stack, returns whether it succeeded
+    if isinstance(result, Exception):
+        print(f"{stack_path}: failed, {result}", file=sys.stderr)
+        return False
+
+    _, n_seeds, n_cells, statistics = result
+    print(f"{stack_path}: {n_cells} cells fitted from {n_seeds} seeds")
+    if statistics is not None:
+        print(statistics)
+    return True
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+
+def auto_contrast(img, channel, percentiles=(0.5, 99.5), max_frames=8, max_samples=2**20):
+    """
+    Display range of a channel: the given percentiles of the intensities in up to max_frames evenly
+    spaced frames, subsampled to about max_samples pixels. 8 and 16 bit images use a histogram.
+
+    Returns:
+    (low, high) with high > low
+    """
+    n_frames, _, height, width = img.shape
+    frames = np.unique(np.linspace(0, n_frames - 1, min(n_frames, max_frames)).astype(int))
+    step = max(1, int(np.sqrt(height * width * len(frames) / max_samples)))
+    values = np.concatenate([np.asarray(img[frame, channel])[::step, ::step].ravel() for frame in frames])
+
+    if values.dtype in [np.uint8, np.uint16]:
+        cumulative = np.cumsum(np.bincount(values))
+        ranks = np.asarray(percentiles) / 100 * (values.size - 1)
+        low, high = np.searchsorted(cumulative, ranks, side='right')
+    else:
+        low, high = np.percentile(values, percentiles)
+
+    low, high = float(low), float(high)
+    return (low, high) if high > low else (low, low + 1)
+
+def display_lut(low, high, dtype=np.uint16):
+    """
+    Lookup table that maps every value of an 8 or 16 bit image to 0-255, linear between low and high.
+    """
+    values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float64)
+    return np.clip((values - low) * (255 / (high - low)) + 0.5, 0, 255).astype(np.uint8)
+
+def to_display(plane, low, high, lut=None):
+    """
+    Convert a plane to a contiguous 8 bit image for display, with the lookup table if one is given.
+    """
+    plane = np.asarray(plane)
+    if lut is not None:
+        return np.take(lut, plane)
+    return np.clip((plane - low) * (255 / (high - low)) + 0.5, 0, 255).astype(np.uint8)
+
+class DisplayCache:
+    """
+    Least recently used cache of 8 bit display frames of one stack, per (frame, channel, contrast).
+
+    The contrast of a channel is computed once with auto_contrast, unless it is set with
+    set_contrast. 8 and 16 bit images are converted with a lookup table per contrast.
+    The cache holds at most max_bytes of display frames. It can be shared with a DisplayPrefetcher,
+    frames are converted outside of the lock, so a slow conversion does not block other threads.
+    """
+    def __init__(self, img, max_bytes=256 * 2**20):
+        self.img = img
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._contrast = {}
+        self._luts = {}
+        self._lock = threading.Lock()
+        self._contrast_lock = threading.Lock()
+
+    def get_contrast(self, channel):
+        with self._contrast_lock:
+            if channel not in self._contrast:
+                self._contrast[channel] = auto_contrast(self.img, channel)
+            return self._contrast[channel]
+
+    def set_contrast(self, channel, low=None, high=None):
+        # without low and high, the channel goes back to auto contrast
+        with self._contrast_lock:
+            if low is None or high is None:
+                self._contrast.pop(channel, None)
+            else:
+                self._contrast[channel] = (float(low), float(high))
+
+    def get_lut(self, contrast):
+        if self.img.dtype not in [np.uint8, np.uint16]:
+            return None
+        with self._contrast_lock:
+            if contrast not in self._luts:
+                self._luts[contrast] = display_lut(*contrast, dtype=self.img.dtype)
+            return self._luts[contrast]
+
+    def get(self, frame, channel):
+        """
+        The 8 bit display image of a frame and channel, converted when it is not cached yet.
+        """
+        contrast = self.get_contrast(channel)
+        key = (frame, channel, contrast)
+
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+
+        display = to_display(self.img[frame, channel], *contrast, lut=self.get_lut(contrast))
+        display.flags.writeable = False
+
+        with self._lock:
+            if key in self._frames:
+                # converted by another thread in the meantime
+                return self._frames[key]
+
+            self._frames[key] = display
+            self._bytes += display.nbytes
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+        return display
+
+    def capacity(self):
+        # the number of display frames that fit in the cache
+        return max(1, self.max_bytes // max(self.img.shape[2] * self.img.shape[3], 1))
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+        with self._contrast_lock:
+            self._contrast.clear()
+
+    def __contains__(self, key):
+        # key is (frame, channel), cached with the current contrast of the channel
+        frame, channel = key
+        contrast = self._contrast.get(channel)
+        with self._lock:
+            return contrast is not None and (frame, channel, contrast) in self._frames
+
+    def __len__(self):
+        return len(self._frames)
+
+class DisplayPrefetcher:
+    """
+    Converts the frames around the displayed frame into a DisplayCache in a background thread.
+
+    After request(frame, channel), up to ahead frames in the direction the user is moving and
+    behind frames in the other direction are converted, nearest first. A new request makes the
+    frames of the previous one stale: they are skipped, only a conversion that already started
+    finishes. At most half of the cache is used for prefetched frames.
+    """
+    def __init__(self, cache, ahead=8, behind=4):
+        self.cache = cache
+        self.ahead = ahead
+        self.behind = behind
+        self._request = None
+        self._generation = 0
+        self._previous = None
+        self._stopped = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='DisplayPrefetcher', daemon=True)
+        self._thread.start()
+
+    def neighbours(self, frame, direction=1):
+        """
+        The frames to prefetch around frame, nearest first, alternating between the frames ahead
+        in direction and the frames behind.
+        """
+        n_frames = self.cache.img.shape[0]
+        ahead, behind = self.ahead, self.behind
+        limit = self.cache.capacity() // 2
+        if ahead + behind > limit:
+            ahead, behind = (limit + 1) // 2, limit // 2
+
+        frames = []
+        for distance in range(1, max(ahead, behind) + 1):
+            if distance <= ahead:
+                frames.append(frame + direction * distance)
+            if distance <= behind:
+                frames.append(frame - direction * distance)
+        return [f for f in frames if 0 <= f < n_frames]
+
+    def request(self, frame, channel):
+        # prefetch around the frame that is displayed now, replacing any earlier request
+        direction = -1 if self._previous is not None and frame < self._previous else 1
+        self._previous = frame
+
+        with self._condition:
+            self._generation += 1
+            self._request = (self._generation, self.neighbours(frame, direction), channel)
+            self._idle.clear()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopped:
+                    self._idle.set()
+                    self._condition.wait()
+                if self._stopped:
+                    self._idle.set()
+                    return
+                generation, frames, channel = self._request
+                self._request = None
+
+            for frame in frames:
+                if self._stopped or generation != self._generation:
+                    break
+                try:
+                    self.cache.get(frame, channel)
+                except Exception:
+                    # prefetching is best effort, errors show up when the frame is displayed
+                    break
+
+    def wait(self, timeout=None):
+        # wait until all requested frames have been converted, returns False on timeout
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
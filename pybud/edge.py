@@ -0,0 +1,374 @@
+import numpy as np
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from .kernels import resolve_backend, search_rays
+from .stats import stage_timer
+
+N_ANGLES = 360
+
+@lru_cache(maxsize=16)
+def ray_offsets(cell_radius):
+    """
+    Precompute the (angle x radius) pixel offset table used for ray casting.
+
+    Parameters:
+    cell_radius (int): maximum cell radius in pixels
+
+    Returns:
+    tuple of two read-only int arrays of shape (360, cell_radius + 1) with the
+    rounded x and y offsets of every sample along every ray
+    """
+    alpha = np.arange(N_ANGLES) * np.pi / 180.0
+    i = np.arange(cell_radius + 1)
+
+    # np.round rounds half to even, exactly like the builtin round()
+    dx = np.round(i[np.newaxis, :] * np.cos(alpha)[:, np.newaxis]).astype(np.int64)
+    dy = np.round(i[np.newaxis, :] * np.sin(alpha)[:, np.newaxis]).astype(np.int64)
+
+    dx.flags.writeable = False
+    dy.flags.writeable = False
+    return dx, dy
+
+def sample_rays(plane, x, y, cell_radius, background, start=None, length=None):
+    """
+    Sample the intensity profiles along all rays cast from one or more seed points.
+
+    Parameters:
+    plane (2D array): brightfield image of a single frame and channel
+    x, y (scalar or 1D array): seed coordinates in pixels
+    cell_radius (int): maximum cell radius in pixels
+    background (float): value used for samples that fall outside the image
+    start (int array of shape (n, 360)): optional index of the first sample of every ray,
+    to sample only a band of length samples instead of the whole ray (see annulus_start)
+    length (int): number of samples per ray when start is given
+
+    Returns:
+    ray_x, ray_y (int32 arrays of shape (n, 360, cell_radius + 1), or (n, 360, length)):
+    sample coordinates
+    profiles (float64 array of the same shape): sampled pixel values
+    """
+    img_height, img_width = plane.shape
+    dx, dy = ray_offsets(cell_radius)
+
+    if start is not None:
+        # pick the band of every ray from the offset table
+        index = start[..., np.newaxis] + np.arange(length)
+        angles = np.arange(N_ANGLES)[:, np.newaxis]
+        dx, dy = dx[angles, index], dy[angles, index]
+
+    x = np.atleast_1d(x)[:, np.newaxis, np.newaxis]
+    y = np.atleast_1d(y)[:, np.newaxis, np.newaxis]
+
+    # casting to int32 truncates non-integer seed coordinates like the reference loop does
+    ray_x = (x + dx).astype(np.int32)
+    ray_y = (y + dy).astype(np.int32)
+
+    # gather every sample in a single fancy-indexed read, out of bounds samples get the background
+    inside = (ray_x >= 0) & (ray_x < img_width) & (ray_y >= 0) & (ray_y < img_height)
+    profiles = np.full(ray_x.shape, background, dtype=np.float64)
+    profiles[inside] = plane[ray_y[inside], ray_x[inside]]
+
+    return ray_x, ray_y, profiles
+
+def annulus_start(params, x, y, cell_radius, edge_size, band):
+    """
+    Restrict the rays cast from seed points to a band around predicted cell boundaries,
+    e.g. the ellipses of the previous frame of a track.
+
+    Parameters:
+    params (array of shape (n, 5)): ellipse parameters [x_center, y_center, a, b, angle]
+    x, y (1D arrays): seed coordinates in pixels, inside the ellipses
+    cell_radius, edge_size (int): maximum cell radius and edge size in pixels
+    band (int): half width of the band around the boundary in pixels
+
+    Returns:
+    start (int array of shape (n, 360)): index of the first sample of every ray
+    length (int): number of samples per ray
+    valid (bool array of shape (n,)): seeds for which a band could be placed, the others
+    need a full search
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+    x = np.atleast_1d(x).astype(np.float64)
+    y = np.atleast_1d(y).astype(np.float64)
+
+    # the edge window and the last sample, which search_edges never uses, are added to the band
+    length = 2 * band + edge_size + 2
+    if length >= cell_radius + 1:
+        return np.zeros((len(x), N_ANGLES), dtype=np.intp), cell_radius + 1, np.zeros(len(x), dtype=bool)
+
+    xc, yc, a, b, angle = (params[:, i, np.newaxis] for i in range(5))
+    alpha = np.arange(N_ANGLES) * np.pi / 180.0
+
+    # seed and ray direction in the frame of the ellipse
+    cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+    px = (x[:, np.newaxis] - xc) * cos_angle + (y[:, np.newaxis] - yc) * sin_angle
+    py = -(x[:, np.newaxis] - xc) * sin_angle + (y[:, np.newaxis] - yc) * cos_angle
+    ux = np.cos(alpha) * cos_angle + np.sin(alpha) * sin_angle
+    uy = -np.cos(alpha) * sin_angle + np.sin(alpha) * cos_angle
+
+    # distance along each ray to the boundary, the positive root of the ellipse equation
+    with np.errstate(divide='ignore', invalid='ignore'):
+        qa = (ux / a) ** 2 + (uy / b) ** 2
+        qb = 2 * (px * ux / a**2 + py * uy / b**2)
+        qc = (px / a) ** 2 + (py / b) ** 2 - 1
+        radius = (-qb + np.sqrt(qb**2 - 4 * qa * qc)) / (2 * qa)
+
+    valid = np.all(np.isfinite(radius), axis=1) & (qc[:, 0] < 0)
+    radius = np.where(valid[:, np.newaxis], radius, 0)
+
+    start = np.clip(np.round(radius).astype(np.intp) - band - edge_size // 2, 0, cell_radius + 1 - length)
+    return start, length, valid
+
+def search_edges(profiles, edge_size, edge_rel_min, background):
+    """
+    Find the strongest edge along every ray using a sliding window of edge_size samples.
+
+    For each ray the first window with the largest max - min difference is selected, provided
+    that the difference relative to the background exceeds edge_rel_min percent. Windows cover
+    the samples up to, but not including, the last sample of the ray.
+
+    Parameters:
+    profiles (array of shape (..., n_samples)): sampled pixel values along the rays
+    edge_size (int): window size in pixels
+    edge_rel_min (float): relative minimum difference in percent of the background
+    background (float): background value
+
+    Returns:
+    found (bool array of shape (...)): whether an edge was found along the ray
+    limit_ptr (int array): sample index of the edge along the ray
+    max_dif (float array): intensity difference over the edge
+    edge (int array): signed width of the edge (argmax - argmin within the window)
+    """
+    # the reference loop never lets a window reach the last sample of a ray
+    profiles = profiles[..., :-1]
+    n_windows = profiles.shape[-1] - edge_size + 1
+    batch_shape = profiles.shape[:-1]
+
+    if n_windows <= 0:
+        zeros = np.zeros(batch_shape, dtype=np.int64)
+        return np.zeros(batch_shape, dtype=bool), zeros, np.zeros(batch_shape), zeros
+
+    windows = sliding_window_view(profiles, edge_size, axis=-1)
+    current_dif = windows.max(axis=-1) - windows.min(axis=-1)
+
+    # Calculate relative difference based on background
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pixel_val_rel_dif = (100 * current_dif) / background
+
+    # the first window with the largest qualifying difference wins, as in the reference loop
+    candidate_dif = np.where(pixel_val_rel_dif > edge_rel_min, current_dif, 0)
+    best = np.argmax(candidate_dif, axis=-1)
+    max_dif = np.take_along_axis(candidate_dif, best[..., np.newaxis], axis=-1)[..., 0]
+    found = max_dif > 0
+
+    # locate the minimum and maximum within the selected window only
+    best_window = np.take_along_axis(windows, best[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    arg_max = np.argmax(best_window, axis=-1)
+    arg_min = np.argmin(best_window, axis=-1)
+
+    limit_ptr = np.where(found, best + (arg_max + arg_min) // 2, 0)
+    edge = np.where(found, arg_max - arg_min, 0)
+    max_dif = np.where(found, max_dif, 0)
+
+    return found, limit_ptr, max_dif, edge
+
+def estimate_background(plane, median=np.median):
+    """
+    Estimate the background of a brightfield image as the median of the
+    region (50,50)-(width-100,height-100).
+    """
+    img_height, img_width = plane.shape
+    return median(plane[50:img_height-100, 50:img_width-100])
+
+def cast_rays(plane, x, y, cell_radius, edge_size, edge_rel_min, background, start=None, length=None, backend='numpy'):
+    """
+    Cast 360 rays from one or more seed points and record the strongest edge along each ray.
+    With start and length only a band of every ray is searched, see sample_rays. The 'numba'
+    backend samples and searches the rays in a compiled kernel, with identical results.
+
+    Returns:
+    dict with the (n, 360) arrays pixel_found, found_x, found_y, found_rad, found_dif,
+    found_edge and found_slope, before any outlier filtering
+    """
+    if resolve_backend(backend) == 'numba':
+        dx, dy = ray_offsets(cell_radius)
+        found, found_x, found_y, max_dif, edge = search_rays(plane, np.atleast_1d(x), np.atleast_1d(y), dx, dy, background, edge_size, edge_rel_min, start, length)
+    else:
+        ray_x, ray_y, profiles = sample_rays(plane, x, y, cell_radius, background, start, length)
+        found, limit_ptr, max_dif, edge = search_edges(profiles, edge_size, edge_rel_min, background)
+
+        found_x = np.where(found, np.take_along_axis(ray_x, limit_ptr[..., np.newaxis], axis=-1)[..., 0], 0).astype(np.float64)
+        found_y = np.where(found, np.take_along_axis(ray_y, limit_ptr[..., np.newaxis], axis=-1)[..., 0], 0).astype(np.float64)
+
+    # vecdot matches the dot product np.linalg.norm uses in the reference engine bit for bit
+    x = np.atleast_1d(x)[:, np.newaxis]
+    y = np.atleast_1d(y)[:, np.newaxis]
+    offsets = np.stack([found_x - x, found_y - y], axis=-1)
+    found_rad = np.where(found, np.sqrt(np.vecdot(offsets, offsets)), 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        found_slope = np.where(found, max_dif / edge, 0)
+
+    return {
+        'pixel_found': found,
+        'found_x': found_x,
+        'found_y': found_y,
+        'found_rad': found_rad,
+        'found_dif': max_dif.astype(np.float64),
+        'found_edge': edge.astype(np.float64),
+        'found_slope': found_slope,
+    }
+
+def _masked_mean_std(values, mask):
+    # mean and standard deviation per row over the masked entries, nan for empty rows
+    count = np.sum(mask, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.sum(np.where(mask, values, 0), axis=-1) / count
+        sdev = np.sqrt(np.sum(np.where(mask, (values - mean[..., np.newaxis]) ** 2, 0), axis=-1) / count)
+    return mean[..., np.newaxis], sdev[..., np.newaxis]
+
+def filter_edges(rays, img_height, img_width, min_pixels=150, statistics=None):
+    """
+    Batched version of the outlier filters in Cell.filter_edge_points.
+
+    Parameters:
+    rays (dict): output of cast_rays with (n, 360) arrays
+    img_height, img_width (int): image size in pixels
+    min_pixels (int): minimum number of edge points required to accept a cell
+    statistics (RunStatistics): optional, counts the rays that pass each filter
+
+    Returns:
+    pixel_found (bool array of shape (n, 360)), cell_found (bool array of shape (n,))
+    and mean_edge (float array of shape (n,))
+    """
+    pixel_found = rays['pixel_found'].copy()
+    found_rad, found_dif, found_slope = rays['found_rad'], rays['found_dif'], rays['found_slope']
+
+    def count_rays(name, mask):
+        if statistics is not None:
+            statistics.count_rays(name, np.sum(mask))
+
+    count_rays('cast', np.ones(pixel_found.shape, dtype=bool))
+    count_rays('edge_found', pixel_found)
+
+    # Remove outliers in radii
+    mean_rad, sdev_rad = _masked_mean_std(found_rad, pixel_found)
+    pixel_found &= (found_rad >= mean_rad - 2 * sdev_rad) & (found_rad <= mean_rad + 2 * sdev_rad)
+    count_rays('radius', pixel_found)
+
+    # Filter out low differences
+    mean_dif, sdev_dif = _masked_mean_std(found_dif, pixel_found)
+    pixel_found &= found_dif >= mean_dif - sdev_dif
+    count_rays('difference', pixel_found)
+
+    # Filter based on slope values
+    mean_slope, sdev_slope = _masked_mean_std(found_slope, pixel_found)
+    pixel_found &= found_slope >= mean_slope - sdev_slope
+    count_rays('slope', pixel_found)
+
+    # Slope consistency filter, the median is taken over all rays like in Cell.filter_edge_points
+    slope_median = np.median(found_slope, axis=-1)[..., np.newaxis]
+    pixel_found &= np.where(slope_median < 0, found_slope < 0, found_slope >= 0)
+    count_rays('slope_sign', pixel_found)
+
+    # Check if enough pixels were found and if they are within the bounds of the image
+    count = np.sum(pixel_found, axis=-1)
+    found_x, found_y = rays['found_x'], rays['found_y']
+    out_of_bounds = pixel_found & ((found_x < 2) | (found_x > img_width - 2) | (found_y < 2) | (found_y > img_height - 2))
+    cell_found = (count >= min_pixels) & ~np.any(out_of_bounds, axis=-1)
+    count_rays('accepted', pixel_found & cell_found[..., np.newaxis])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_edge = np.where(count >= min_pixels, np.sum(np.where(pixel_found, rays['found_edge'], 0), axis=-1) / count, 0)
+
+    return pixel_found, cell_found, mean_edge
+
+class CellEdge:
+    """
+    Edge points found for a single seed, as produced by find_cell_edges.
+    The attributes match the ones Cell.get_cell_edge sets, search is 'annulus' when the edge
+    was found in a band around a previous ellipse and 'full' otherwise.
+    """
+    def __init__(self, x, y, pixel_found, found_x, found_y, found_rad, found_dif, found_edge, found_slope, cell_found, mean_edge, search='full'):
+        self.x_selected = x
+        self.y_selected = y
+        self.pixel_found = pixel_found
+        self.found_x = found_x
+        self.found_y = found_y
+        self.found_rad = found_rad
+        self.found_dif = found_dif
+        self.found_edge = found_edge
+        self.found_slope = found_slope
+        self.cell_found = cell_found
+        self.mean_edge = mean_edge
+        self.search = search
+
+def find_cell_edges(plane, x, y, cell_radius, edge_size, edge_rel_min, background=None, previous=None, band=None, statistics=None, backend='numpy'):
+    """
+    Detect the edges of many cells in the same frame at once.
+
+    All rays of all seeds are sampled into one (cells x angles x radius) tensor and the
+    outlier filters are applied as batched array operations. The results agree with
+    Cell.get_cell_edge up to floating point rounding in the outlier statistics.
+
+    When previous ellipses are given, seeds are first searched only within band pixels of
+    the previous boundary. Seeds for which that narrow search does not find the cell are
+    searched again along the whole rays.
+
+    Parameters:
+    plane (2D array): brightfield image of a single frame and channel
+    x, y (1D arrays): seed coordinates in pixels
+    cell_radius, edge_size (int): maximum cell radius and edge size in pixels
+    edge_rel_min (float): relative minimum edge difference in percent
+    background (float): background value, estimated from the plane when not given
+    previous (sequence of n ellipse parameter arrays or None): the ellipses of the previous frame
+    band (int): half width of the band around the previous ellipses in pixels
+    statistics (RunStatistics): optional, collects the timings and ray counts
+    backend (str): 'numpy', 'numba' or 'auto', see cast_rays
+
+    Returns:
+    list of CellEdge, one per seed
+    """
+    x = np.atleast_1d(x)
+    y = np.atleast_1d(y)
+    if len(x) == 0:
+        return []
+
+    if background is None:
+        background = estimate_background(plane)
+
+    img_height, img_width = plane.shape
+    edges = [None] * len(x)
+    remaining = np.arange(len(x))
+
+    if previous is not None and band is not None:
+        has_previous = np.array([params is not None for params in previous], dtype=bool)
+        params = np.array([params if params is not None else np.full(5, np.nan) for params in previous], dtype=np.float64).reshape(-1, 5)
+        start, length, valid = annulus_start(params, x, y, cell_radius, edge_size, band)
+
+        narrow = np.flatnonzero(has_previous & valid)
+        if len(narrow):
+            with stage_timer(statistics, 'ray_sampling'):
+                rays = cast_rays(plane, x[narrow], y[narrow], cell_radius, edge_size, edge_rel_min, background, start[narrow], length, backend)
+            with stage_timer(statistics, 'outlier_filtering'):
+                pixel_found, cell_found, mean_edge = filter_edges(rays, img_height, img_width, statistics=statistics)
+            for j, i in enumerate(narrow):
+                if cell_found[j]:
+                    edges[i] = _cell_edge(x, y, i, rays, j, pixel_found, cell_found, mean_edge, 'annulus')
+
+        remaining = np.array([i for i in range(len(x)) if edges[i] is None], dtype=np.intp)
+
+    if len(remaining):
+        with stage_timer(statistics, 'ray_sampling'):
+            rays = cast_rays(plane, x[remaining], y[remaining], cell_radius, edge_size, edge_rel_min, background, backend=backend)
+        with stage_timer(statistics, 'outlier_filtering'):
+            pixel_found, cell_found, mean_edge = filter_edges(rays, img_height, img_width, statistics=statistics)
+        for j, i in enumerate(remaining):
+            edges[i] = _cell_edge(x, y, i, rays, j, pixel_found, cell_found, mean_edge, 'full')
+
+    return edges
+
+def _cell_edge(x, y, i, rays, j, pixel_found, cell_found, mean_edge, search):
+    # the CellEdge of seed i from row j of a batch of rays
+    return CellEdge(x[i], y[i], pixel_found[j], rays['found_x'][j], rays['found_y'][j], rays['found_rad'][j],
+                    rays['found_dif'][j], rays['found_edge'][j], rays['found_slope'][j], cell_found[j], mean_edge[j], search)
@@ -1,201 +1,414 @@
-import numpy as np
-from scipy.optimize import least_squares
-from numpy.linalg import eig, inv
-
-class Ellipse:
-    def __init__(self, x, y, method='geometric'):
-        """
-        Initialize the Ellipse object.
-
-        Parameters:
-        x (array-like): x coordinates of the points
-        y (array-like): y coordinates of the points
-        method (str): The fitting method to use ('geometric' or 'algebraic')
-        """
-        self.x = np.asarray(x)
-        self.y = np.asarray(y)
-        self.method = method
-
-        if method == 'geometric':
-            self.params = self.fit_geometric_ellipse()
-        elif method == 'algebraic':
-            self.params = self.fit_algebraic_ellipse()
-        else:
-            raise ValueError("Invalid method. Choose 'geometric' or 'algebraic'.")
-    
-    def __str__(self):
-        return (f"Ellipse Parameters:\n"
-                f"Center: ({self.get_x_center():.2f}, {self.get_y_center():.2f})\n"
-                f"Major Axis: {self.get_major():.2f}\n"
-                f"Minor Axis: {self.get_minor():.2f}\n"
-                f"Angle: {self.get_angle():.2f} degrees")
-
-    # Geometric fitting using least squares
-    def ellipse_equation(self, params, x, y):
-        xc, yc, a, b, angle = params
-        cos_angle = np.cos(angle)
-        sin_angle = np.sin(angle)
-
-        x_rot = (x - xc) * cos_angle + (y - yc) * sin_angle
-        y_rot = -(x - xc) * sin_angle + (y - yc) * cos_angle
-
-        return (x_rot / a) ** 2 + (y_rot / b) ** 2 - 1
-
-    def fit_geometric_ellipse(self):
-        # Initial guess for the parameters [x_center, y_center, major_axis, minor_axis, angle]
-        x_center_guess = np.mean(self.x)
-        y_center_guess = np.mean(self.y)
-        semi_major_axis_guess = (np.max(self.x) - np.min(self.x)) / 2
-        semi_minor_axis_guess = (np.max(self.y) - np.min(self.y)) / 2
-        angle_guess = 0
-
-        initial_guess = [x_center_guess, y_center_guess, semi_major_axis_guess, semi_minor_axis_guess, angle_guess]
-
-        result = least_squares(self.ellipse_equation, initial_guess, args=(self.x, self.y))
-        return result.x
-
-    # Algebraic method integrated directly into the class
-    # https://scipython.com/blog/direct-linear-least-squares-fitting-of-an-ellipse/
-    def fit_algebraic_ellipse(self):
-        # Construct design matrices
-        D1 = np.vstack([self.x**2, self.x * self.y, self.y**2]).T
-        D2 = np.vstack([self.x, self.y, np.ones(len(self.x))]).T
-
-        # Scatter matrices
-        S1 = D1.T @ D1
-        S2 = D1.T @ D2
-        S3 = D2.T @ D2
-
-        # Solving for the linear system
-        T = -np.linalg.inv(S3) @ S2.T
-        M = S1 + S2 @ T
-
-        # Constraint matrix for ellipse
-        C = np.array([[0, 0, 2], [0, -1, 0], [2, 0, 0]], dtype=float)
-
-        # Solve generalized eigenvalue problem
-        M = np.linalg.inv(C) @ M
-        eigvals, eigvecs = np.linalg.eig(M)
-
-        # Select the eigenvector corresponding to the positive eigenvalue
-        con = 4 * eigvecs[0] * eigvecs[2] - eigvecs[1]**2
-        pos_eig_idx = np.argmax(con > 0)
-        a = eigvecs[:, pos_eig_idx]
-
-        # Final conic coefficients
-        conic_coeffs = np.concatenate((a, T @ a))
-
-        # Now convert the conic coefficients to ellipse parameters
-        A, B, C, D, E, F = conic_coeffs
-        B /= 2
-        D /= 2
-        E /= 2
-
-        # Calculate the center (x0, y0)
-        den = B**2 - A*C
-        if den > 0:
-            raise ValueError("Invalid coefficients for an ellipse. b^2 - 4ac must be negative.")
-
-        x0 = (C * D - B * E) / den
-        y0 = (A * E - B * D) / den
-
-        # Calculate the semi-major (a) and semi-minor (b) axes
-        numerator = 2 * (A * E**2 + C * D**2 + F * B**2 - 2 * B * D * E - A * C * F)
-        fac = np.sqrt((A - C)**2 + 4 * B**2)
-        a_axis = np.sqrt(numerator / den / (fac - (A + C)))
-        b_axis = np.sqrt(numerator / den / (-fac - (A + C)))
-
-        # Calculate the angle of rotation (phi)
-        if B == 0:
-            angle = 0 if A < C else np.pi / 2
-        else:
-            angle = np.arctan((2 * B) / (A - C)) / 2
-            if A > C:
-                angle += np.pi / 2
-
-        # Return the ellipse parameters [x_center, y_center, major_axis, minor_axis, angle]
-        return np.array([x0, y0, a_axis, b_axis, angle])
-
-    def get_x_center(self):
-        return self.params[0]
-
-    def get_y_center(self):
-        return self.params[1]
-
-    def get_major(self):
-        return max(self.params[2], self.params[3])
-
-    def get_minor(self):
-        return min(self.params[2], self.params[3])
-    
-    def get_angle(self):
-        a, b = self.params[2], self.params[3]
-        angle = self.params[4]
-        if b > a:
-            return np.degrees(angle) + 90
-        return np.degrees(angle)
-    
-    def generate_ellipse_points(self, n_points=100):
-        theta = np.linspace(0, 2 * np.pi, n_points)
-        a = self.get_major()
-        b = self.get_minor()
-        angle = np.radians(self.get_angle())
-
-        x_center = self.get_x_center()
-        y_center = self.get_y_center()
-
-        x = a * np.cos(theta)
-        y = b * np.sin(theta)
-
-        cos_angle = np.cos(angle)
-        sin_angle = np.sin(angle)
-
-        x_rot = x_center + x * cos_angle - y * sin_angle
-        y_rot = y_center + x * sin_angle + y * cos_angle
-
-        return x_rot, y_rot
-
-    def get_r_squared(self):
-        residuals = self.ellipse_equation(self.params, self.x, self.y)
-        ss_residual = np.sum(residuals**2)
-        ss_total = np.sum((self.y - np.mean(self.y)) ** 2)
-        return 1 - (ss_residual / ss_total)
-
-    def get_parameter_error(self):
-        return np.std(self.ellipse_equation(self.params, self.x, self.y))
-    
-    def get_mask(self, img_height, img_width):
-        # Create a sparse grid of coordinates
-        y, x = np.ogrid[:img_height, :img_width]
-
-        # Adjust coordinates by shifting 0.5 to align with pixel centers
-        x = x - self.get_x_center()
-        y = y - self.get_y_center()
-
-        # Rotation matrix components
-        cos_angle = np.cos(np.radians(self.get_angle()))
-        sin_angle = np.sin(np.radians(self.get_angle()))
-
-        # Apply rotation to the coordinates
-        x_rot = x * cos_angle + y * sin_angle
-        y_rot = -x * sin_angle + y * cos_angle
-
-        # Ellipse equation
-        mask = (x_rot / self.get_major()) ** 2 + (y_rot / self.get_minor()) ** 2 <= 1
-
-        return mask
-
-
-# Example usage
-if __name__ == "__main__":
-    x = np.array([75, 62, 18, 30])
-    y = np.array([27, 71, 80, 37])
-
-    ellipse_geometric = Ellipse(x, y, method='geometric')
-    ellipse_algebraic = Ellipse(x, y, method='algebraic')
-
-    print("Geometric Method:")
-    print(f"Center: ({ellipse_geometric.get_x_center()}, {ellipse_geometric.get_y_center()}), Major: {ellipse_geometric.get_major()}, Minor: {ellipse_geometric.get_minor()}, Angle: {ellipse_geometric.get_angle()}")
-
-    print("Algebraic Method:")
-    print(f"Center: ({ellipse_algebraic.get_x_center()}, {ellipse_algebraic.get_y_center()}), Major: {ellipse_algebraic.get_major()}, Minor: {ellipse_algebraic.get_minor()}, Angle: {ellipse_algebraic.get_angle()}")
+import numpy as np
+from scipy.optimize import least_squares
+from numpy.linalg import eig, inv
+from .kernels import ellipse_mask, resolve_backend
+
+class Ellipse:
+    def __init__(self, x, y, method='geometric', initial_guess=None, max_nfev=None, tolerance=1e-8):
+        """
+        Initialize the Ellipse object.
+
+        Parameters:
+        x (array-like): x coordinates of the points
+        y (array-like): y coordinates of the points
+        method (str): The fitting method to use ('geometric' or 'algebraic')
+        initial_guess (array-like, 'algebraic' or None): starting parameters of the geometric fit,
+        e.g. the ellipse of the previous frame, None starts from the bounding box of the points
+        max_nfev (int or None): maximum number of function evaluations of the geometric fit
+        tolerance (float): ftol, xtol and gtol of the geometric fit
+        """
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.method = method
+
+        if method == 'geometric':
+            self.params = self.fit_geometric_ellipse(initial_guess, max_nfev, tolerance)
+        elif method == 'algebraic':
+            self.params = self.fit_algebraic_ellipse()
+        else:
+            raise ValueError("Invalid method. Choose 'geometric' or 'algebraic'.")
+    
+    @classmethod
+    def from_params(cls, x, y, params, method='algebraic'):
+        """
+        Create an Ellipse from already fitted parameters, e.g. from fit_algebraic_ellipses.
+        """
+        ellipse = cls.__new__(cls)
+        ellipse.x = np.asarray(x)
+        ellipse.y = np.asarray(y)
+        ellipse.method = method
+        ellipse.params = np.asarray(params, dtype=np.float64)
+        return ellipse
+
+    def __str__(self):
+        return (f"Ellipse Parameters:\n"
+                f"Center: ({self.get_x_center():.2f}, {self.get_y_center():.2f})\n"
+                f"Major Axis: {self.get_major():.2f}\n"
+                f"Minor Axis: {self.get_minor():.2f}\n"
+                f"Angle: {self.get_angle():.2f} degrees")
+
+    # Geometric fitting using least squares
+    def ellipse_equation(self, params, x, y):
+        xc, yc, a, b, angle = params
+        cos_angle = np.cos(angle)
+        sin_angle = np.sin(angle)
+
+        x_rot = (x - xc) * cos_angle + (y - yc) * sin_angle
+        y_rot = -(x - xc) * sin_angle + (y - yc) * cos_angle
+
+        return (x_rot / a) ** 2 + (y_rot / b) ** 2 - 1
+
+    def ellipse_jacobian(self, params, x, y):
+        # Analytic derivatives of ellipse_equation, shape (n_points, 5)
+        xc, yc, a, b, angle = params
+        cos_angle = np.cos(angle)
+        sin_angle = np.sin(angle)
+
+        x_rot = (x - xc) * cos_angle + (y - yc) * sin_angle
+        y_rot = -(x - xc) * sin_angle + (y - yc) * cos_angle
+
+        x_term = 2 * x_rot / a**2
+        y_term = 2 * y_rot / b**2
+
+        jacobian = np.empty((len(x), 5))
+        jacobian[:, 0] = -x_term * cos_angle + y_term * sin_angle
+        jacobian[:, 1] = -x_term * sin_angle - y_term * cos_angle
+        jacobian[:, 2] = -x_term * x_rot / a
+        jacobian[:, 3] = -y_term * y_rot / b
+        jacobian[:, 4] = x_term * y_rot - y_term * x_rot
+        return jacobian
+
+    @staticmethod
+    def canonical_params(params):
+        """
+        Equivalent parameters with positive axes, the first axis being the major axis and
+        the angle in [-pi/2, pi/2), so that fitted parameters can be reused as an initial guess.
+        """
+        xc, yc, a, b, angle = params
+        a, b = abs(a), abs(b)
+        if b > a:
+            a, b = b, a
+            angle += np.pi / 2
+        angle = (angle + np.pi / 2) % np.pi - np.pi / 2
+        return np.array([xc, yc, a, b, angle], dtype=np.float64)
+
+    def fit_geometric_ellipse(self, initial_guess=None, max_nfev=None, tolerance=1e-8):
+        if isinstance(initial_guess, str) and initial_guess == 'algebraic':
+            # start from the direct algebraic solution, if there is one
+            try:
+                initial_guess = self.fit_algebraic_ellipse()
+            except (ValueError, np.linalg.LinAlgError):
+                initial_guess = None
+            if initial_guess is not None and not np.all(np.isfinite(initial_guess)):
+                initial_guess = None
+
+        if initial_guess is None:
+            # Initial guess for the parameters [x_center, y_center, major_axis, minor_axis, angle]
+            x_center_guess = np.mean(self.x)
+            y_center_guess = np.mean(self.y)
+            semi_major_axis_guess = (np.max(self.x) - np.min(self.x)) / 2
+            semi_minor_axis_guess = (np.max(self.y) - np.min(self.y)) / 2
+            angle_guess = 0
+
+            initial_guess = [x_center_guess, y_center_guess, semi_major_axis_guess, semi_minor_axis_guess, angle_guess]
+        else:
+            initial_guess = self.canonical_params(initial_guess)
+
+        result = least_squares(self.ellipse_equation, initial_guess, jac=self.ellipse_jacobian, args=(self.x, self.y),
+                               ftol=tolerance, xtol=tolerance, gtol=tolerance, max_nfev=max_nfev)
+        return result.x
+
+    # Algebraic method integrated directly into the class
+    # https://scipython.com/blog/direct-linear-least-squares-fitting-of-an-ellipse/
+    def fit_algebraic_ellipse(self):
+        # Construct design matrices
+        D1 = np.vstack([self.x**2, self.x * self.y, self.y**2]).T
+        D2 = np.vstack([self.x, self.y, np.ones(len(self.x))]).T
+
+        # Scatter matrices
+        S1 = D1.T @ D1
+        S2 = D1.T @ D2
+        S3 = D2.T @ D2
+
+        # Solving for the linear system
+        T = -np.linalg.inv(S3) @ S2.T
+        M = S1 + S2 @ T
+
+        # Constraint matrix for ellipse
+        C = np.array([[0, 0, 2], [0, -1, 0], [2, 0, 0]], dtype=float)
+
+        # Solve generalized eigenvalue problem
+        M = np.linalg.inv(C) @ M
+        eigvals, eigvecs = np.linalg.eig(M)
+
+        # Select the eigenvector corresponding to the positive eigenvalue
+        con = 4 * eigvecs[0] * eigvecs[2] - eigvecs[1]**2
+        pos_eig_idx = np.argmax(con > 0)
+        a = eigvecs[:, pos_eig_idx]
+
+        # Final conic coefficients
+        conic_coeffs = np.concatenate((a, T @ a))
+
+        # Now convert the conic coefficients to ellipse parameters
+        A, B, C, D, E, F = conic_coeffs
+        B /= 2
+        D /= 2
+        E /= 2
+
+        # Calculate the center (x0, y0)
+        den = B**2 - A*C
+        if den > 0:
+            raise ValueError("Invalid coefficients for an ellipse. b^2 - 4ac must be negative.")
+
+        x0 = (C * D - B * E) / den
+        y0 = (A * E - B * D) / den
+
+        # Calculate the semi-major (a) and semi-minor (b) axes
+        numerator = 2 * (A * E**2 + C * D**2 + F * B**2 - 2 * B * D * E - A * C * F)
+        fac = np.sqrt((A - C)**2 + 4 * B**2)
+        a_axis = np.sqrt(numerator / den / (fac - (A + C)))
+        b_axis = np.sqrt(numerator / den / (-fac - (A + C)))
+
+        # Calculate the angle of rotation (phi)
+        if B == 0:
+            angle = 0 if A < C else np.pi / 2
+        else:
+            angle = np.arctan((2 * B) / (A - C)) / 2
+            if A > C:
+                angle += np.pi / 2
+
+        # Return the ellipse parameters [x_center, y_center, major_axis, minor_axis, angle]
+        return np.array([x0, y0, a_axis, b_axis, angle])
+
+    def get_x_center(self):
+        return self.params[0]
+
+    def get_y_center(self):
+        return self.params[1]
+
+    def get_major(self):
+        return max(self.params[2], self.params[3])
+
+    def get_minor(self):
+        return min(self.params[2], self.params[3])
+    
+    def get_angle(self):
+        a, b = self.params[2], self.params[3]
+        angle = self.params[4]
+        if b > a:
+            return np.degrees(angle) + 90
+        return np.degrees(angle)
+    
+    def generate_ellipse_points(self, n_points=100):
+        theta = np.linspace(0, 2 * np.pi, n_points)
+        a = self.get_major()
+        b = self.get_minor()
+        angle = np.radians(self.get_angle())
+
+        x_center = self.get_x_center()
+        y_center = self.get_y_center()
+
+        x = a * np.cos(theta)
+        y = b * np.sin(theta)
+
+        cos_angle = np.cos(angle)
+        sin_angle = np.sin(angle)
+
+        x_rot = x_center + x * cos_angle - y * sin_angle
+        y_rot = y_center + x * sin_angle + y * cos_angle
+
+        return x_rot, y_rot
+
+    def get_r_squared(self):
+        residuals = self.ellipse_equation(self.params, self.x, self.y)
+        ss_residual = np.sum(residuals**2)
+        ss_total = np.sum((self.y - np.mean(self.y)) ** 2)
+        return 1 - (ss_residual / ss_total)
+
+    def get_parameter_error(self):
+        return np.std(self.ellipse_equation(self.params, self.x, self.y))
+    
+    def get_bounding_box(self, img_height, img_width):
+        # Half extents of the rotated ellipse along x and y
+        a, b = self.get_major(), self.get_minor()
+        cos_angle = np.cos(np.radians(self.get_angle()))
+        sin_angle = np.sin(np.radians(self.get_angle()))
+        half_width = np.hypot(a * cos_angle, b * sin_angle)
+        half_height = np.hypot(a * sin_angle, b * cos_angle)
+
+        # a failed fit has no pixels, like the empty mask get_mask gives for it
+        if not np.all(np.isfinite([self.get_x_center(), self.get_y_center(), half_width, half_height])):
+            return 0, 0, 0, 0
+
+        # Pad by one pixel so rounding never cuts off pixels of the mask
+        x0 = int(np.clip(np.floor(self.get_x_center() - half_width) - 1, 0, img_width))
+        x1 = int(np.clip(np.ceil(self.get_x_center() + half_width) + 2, 0, img_width))
+        y0 = int(np.clip(np.floor(self.get_y_center() - half_height) - 1, 0, img_height))
+        y1 = int(np.clip(np.ceil(self.get_y_center() + half_height) + 2, 0, img_height))
+
+        return x0, x1, y0, y1
+
+    def get_mask_indices(self, img_height, img_width, backend='numpy'):
+        """
+        Row and column indices of the pixels inside the ellipse, in the same order as
+        img[self.get_mask(img_height, img_width)], evaluated only within the bounding box.
+        The 'numba' backend (or 'auto' with numba installed) uses a compiled kernel.
+        """
+        x0, x1, y0, y1 = self.get_bounding_box(img_height, img_width)
+        if resolve_backend(backend) == 'numba':
+            return ellipse_mask((x0, x1, y0, y1), self.get_x_center(), self.get_y_center(), self.get_angle(), self.get_major(), self.get_minor())
+
+        y, x = np.ogrid[y0:y1, x0:x1]
+
+        x = x - self.get_x_center()
+        y = y - self.get_y_center()
+
+        cos_angle = np.cos(np.radians(self.get_angle()))
+        sin_angle = np.sin(np.radians(self.get_angle()))
+
+        x_rot = x * cos_angle + y * sin_angle
+        y_rot = -x * sin_angle + y * cos_angle
+
+        rows, cols = np.nonzero((x_rot / self.get_major()) ** 2 + (y_rot / self.get_minor()) ** 2 <= 1)
+        return rows + y0, cols + x0
+
+    def get_mask(self, img_height, img_width):
+        # Create a sparse grid of coordinates
+        y, x = np.ogrid[:img_height, :img_width]
+
+        # Adjust coordinates by shifting 0.5 to align with pixel centers
+        x = x - self.get_x_center()
+        y = y - self.get_y_center()
+
+        # Rotation matrix components
+        cos_angle = np.cos(np.radians(self.get_angle()))
+        sin_angle = np.sin(np.radians(self.get_angle()))
+
+        # Apply rotation to the coordinates
+        x_rot = x * cos_angle + y * sin_angle
+        y_rot = -x * sin_angle + y * cos_angle
+
+        # Ellipse equation
+        mask = (x_rot / self.get_major()) ** 2 + (y_rot / self.get_minor()) ** 2 <= 1
+
+        return mask
+
+
+def fit_algebraic_ellipses(x, y, mask=None):
+    """
+    Fit many ellipses at once with the algebraic method of Ellipse.fit_algebraic_ellipse.
+
+    The scatter matrices and generalized eigenproblems of all point sets are solved with
+    stacked einsum/linalg calls.
+
+    Parameters:
+    x, y (2D arrays of shape (n, m) or lists of n 1D arrays): the point sets, lists of arrays
+    with different lengths are padded
+    mask (bool array of shape (n, m)): which of the padded points belong to each point set
+
+    Returns:
+    array of shape (n, 5) with [x_center, y_center, major_axis, minor_axis, angle] per point
+    set, rows are nan when no valid ellipse was found
+    """
+    if mask is None and not isinstance(x, np.ndarray):
+        lengths = [len(points) for points in x]
+        width = max(lengths, default=0)
+        mask = np.arange(width)[np.newaxis, :] < np.array(lengths, dtype=np.intp)[:, np.newaxis]
+        x_padded = np.zeros(mask.shape)
+        y_padded = np.zeros(mask.shape)
+        x_padded[mask] = np.concatenate(x) if lengths else []
+        y_padded[mask] = np.concatenate(y) if lengths else []
+        x, y = x_padded, y_padded
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    weight = np.ones(x.shape) if mask is None else np.asarray(mask, dtype=np.float64)
+
+    if x.shape[0] == 0:
+        return np.zeros((0, 5))
+
+    # The scatter matrices of the design matrices [x^2, xy, y^2] and [x, y, 1] only contain
+    # the moments sum(x^p * y^q) with p + q <= 4, padded points get zero weight
+    x_powers = np.stack([weight, x * weight, x**2 * weight, x**3 * weight, x**4 * weight], axis=1)
+    y_powers = np.stack([np.ones(y.shape), y, y**2, y**3, y**4], axis=2)
+    moments = x_powers @ y_powers
+
+    def scatter(rows, cols):
+        # rows and cols hold the (p, q) exponents of the design matrix columns
+        p = np.add.outer([r[0] for r in rows], [c[0] for c in cols])
+        q = np.add.outer([r[1] for r in rows], [c[1] for c in cols])
+        return moments[:, p, q]
+
+    D1 = [(2, 0), (1, 1), (0, 2)]
+    D2 = [(1, 0), (0, 1), (0, 0)]
+    S1 = scatter(D1, D1)
+    S2 = scatter(D1, D2)
+    S3 = scatter(D2, D2)
+
+    params = np.full((x.shape[0], 5), np.nan)
+
+    # point sets with singular scatter matrices have no solution
+    valid = np.abs(np.linalg.det(S3)) > 0
+    if not np.any(valid):
+        return params
+    S1, S2, S3 = S1[valid], S2[valid], S3[valid]
+
+    # Solving for the linear system
+    T = -np.linalg.inv(S3) @ np.swapaxes(S2, 1, 2)
+    M = S1 + S2 @ T
+
+    # Constraint matrix for ellipse
+    C = np.array([[0, 0, 2], [0, -1, 0], [2, 0, 0]], dtype=float)
+
+    # Solve generalized eigenvalue problems
+    M = np.linalg.inv(C) @ M
+    eigvals, eigvecs = np.linalg.eig(M)
+    eigvecs = eigvecs.real
+
+    # Select the eigenvector corresponding to the positive eigenvalue
+    con = 4 * eigvecs[:, 0, :] * eigvecs[:, 2, :] - eigvecs[:, 1, :]**2
+    pos_eig_idx = np.argmax(con > 0, axis=1)
+    a = np.take_along_axis(eigvecs, pos_eig_idx[:, np.newaxis, np.newaxis], axis=2)[:, :, 0]
+
+    # Final conic coefficients
+    A, B, C, D, E, F = np.concatenate((a, np.einsum('nij,nj->ni', T, a)), axis=1).T
+    B = B / 2
+    D = D / 2
+    E = E / 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate the center (x0, y0), b^2 - 4ac must be negative for an ellipse
+        den = B**2 - A*C
+        x0 = (C * D - B * E) / den
+        y0 = (A * E - B * D) / den
+
+        # Calculate the semi-major (a) and semi-minor (b) axes
+        numerator = 2 * (A * E**2 + C * D**2 + F * B**2 - 2 * B * D * E - A * C * F)
+        fac = np.sqrt((A - C)**2 + 4 * B**2)
+        a_axis = np.sqrt(numerator / den / (fac - (A + C)))
+        b_axis = np.sqrt(numerator / den / (-fac - (A + C)))
+
+        # Calculate the angle of rotation (phi)
+        angle = np.where(B == 0,
+                         np.where(A < C, 0, np.pi / 2),
+                         np.arctan((2 * B) / (A - C)) / 2 + np.where(A > C, np.pi / 2, 0))
+
+    fitted = np.stack([x0, y0, a_axis, b_axis, angle], axis=1)
+    fitted[den > 0] = np.nan
+    params[valid] = fitted
+
+    return params
+
+# Example usage
+if __name__ == "__main__":
+    x = np.array([75, 62, 18, 30])
+    y = np.array([27, 71, 80, 37])
+
+    ellipse_geometric = Ellipse(x, y, method='geometric')
+    ellipse_algebraic = Ellipse(x, y, method='algebraic')
+
+    print("Geometric Method:")
+    print(f"Center: ({ellipse_geometric.get_x_center()}, {ellipse_geometric.get_y_center()}), Major: {ellipse_geometric.get_major()}, Minor: {ellipse_geometric.get_minor()}, Angle: {ellipse_geometric.get_angle()}")
+
+    print("Algebraic Method:")
+    print(f"Center: ({ellipse_algebraic.get_x_center()}, {ellipse_algebraic.get_y_center()}), Major: {ellipse_algebraic.get_major()}, Minor: {ellipse_algebraic.get_minor()}, Angle: {ellipse_algebraic.get_angle()}")
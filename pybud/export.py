@@ -0,0 +1,178 @@
+import csv
+import importlib.util
+import os
+from .fluorescence import Fluorescence
+from .results import ResultTable
+
+# format: file extensions
+FORMATS = {
+    'csv': ['.csv'],
+    'parquet': ['.parquet'],
+    'hdf5': ['.h5', '.hdf5'],
+}
+
+# format: optional dependency
+REQUIREMENTS = {'parquet': 'pyarrow', 'hdf5': 'h5py'}
+
+def available_formats():
+    # the formats whose optional dependencies are installed
+    return [name for name in FORMATS if name not in REQUIREMENTS or importlib.util.find_spec(REQUIREMENTS[name]) is not None]
+
+def format_from_path(path):
+    extension = os.path.splitext(str(path))[1].lower()
+    for name, extensions in FORMATS.items():
+        if extension in extensions:
+            return name
+    raise ValueError(f"Unknown result format for {path}, use one of {', '.join(e for es in FORMATS.values() for e in es)}.")
+
+def get_result_columns(results, start=0, stop=None):
+    """
+    Flattened columns of the rows start:stop of a ResultTable, with one column per channel
+    statistic and percentile. The ellipse is given in pixels (x_center, y_center, major_axis,
+    minor_axis) and in micrometers (x_centroid, y_centroid, major, minor).
+
+    Returns:
+    dictionary of column name: 1D array, without copying
+    """
+    rows = slice(start, stop)
+    columns = {name: results[name][rows] for name, _ in results.COLUMNS}
+    for i, channel in enumerate(results.fl_channels):
+        for name in results.CHANNEL_COLUMNS:
+            columns[f"{name}_ch{channel}"] = results[name][rows, i]
+        for j, percentile in enumerate(Fluorescence.PERCENTILES):
+            columns[f"fl_p{percentile}_ch{channel}"] = results['fl_percentiles'][rows, i, j]
+    return columns
+
+def iter_chunks(results, chunk_size=65536):
+    # the columns of a ResultTable in chunks of at most chunk_size rows
+    for start in range(0, len(results), chunk_size):
+        yield get_result_columns(results, start, start + chunk_size)
+
+class CsvWriter:
+    # values are written with full precision, floats as their shortest exact representation
+    def __init__(self, path):
+        self.file = open(path, mode='w', newline='')
+        self.writer = csv.writer(self.file)
+        self.header = False
+
+    def write(self, columns):
+        if not self.header:
+            self.writer.writerow(columns)
+            self.header = True
+        self.writer.writerows(zip(*(column.tolist() for column in columns.values())))
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    # every chunk is written as a row group
+    def __init__(self, path):
+        import pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def write(self, columns):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.table(columns)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class Hdf5Writer:
+    # one resizable dataset per column in the group 'results', grown by every chunk
+    def __init__(self, path, group='results'):
+        import h5py
+        self.file = h5py.File(path, 'w')
+        self.group = self.file.require_group(group)
+
+    def write(self, columns):
+        for name, column in columns.items():
+            if name not in self.group:
+                self.group.create_dataset(name, data=column, maxshape=(None,), chunks=True)
+                continue
+            dataset = self.group[name]
+            size = dataset.shape[0]
+            dataset.resize(size + len(column), axis=0)
+            dataset[size:] = column
+
+    def close(self):
+        self.file.close()
+
+WRITERS = {'csv': CsvWriter, 'parquet': ParquetWriter, 'hdf5': Hdf5Writer}
+
+class ResultWriter:
+    """
+    Write fitted cells to a CSV, Parquet or HDF5 file in chunks, so a run can be exported while it
+    is fitted without keeping its results in memory:
+
+        with ResultWriter(path, pybud.fl_channels, pybud.pixel_size) as writer:
+            for cell in pybud.iter_fit_cells():
+                writer.append_cell(cell)
+
+    Parameters:
+    path (str): the output file
+    fl_channels (list): the fluorescence channels of the cells
+    pixel_size (float): micrometers per pixel
+    output_format (str): 'csv', 'parquet' or 'hdf5', by default from the file extension
+    chunk_size (int): the number of rows that are buffered before they are written
+    """
+    def __init__(self, path, fl_channels=(), pixel_size=1.0, output_format=None, chunk_size=65536):
+        output_format = output_format or format_from_path(path)
+        if output_format not in WRITERS:
+            raise ValueError(f"Invalid output format '{output_format}'. Choose from {', '.join(WRITERS)}.")
+        if output_format not in available_formats():
+            raise ImportError(f"{output_format} export requires {REQUIREMENTS[output_format]}.")
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffer = ResultTable(fl_channels, pixel_size, capacity=chunk_size)
+        self.writer = WRITERS[output_format](path)
+        self.rows = 0
+
+    def append_cell(self, cell):
+        self.buffer.append_cell(cell)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_results(self, results):
+        # all rows of a ResultTable, written chunk by chunk without copying the table
+        self.flush()
+        for columns in iter_chunks(results, self.chunk_size):
+            self.writer.write(columns)
+            self.rows += len(columns['cell_id'])
+
+    def flush(self):
+        if len(self.buffer):
+            self.writer.write(get_result_columns(self.buffer))
+            self.rows += len(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        # an empty export still gets its header
+        if self.rows == 0 and len(self.buffer) == 0:
+            self.writer.write(get_result_columns(self.buffer))
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def write_results(results, path, output_format=None, chunk_size=65536):
+    """
+    Write a ResultTable to a CSV, Parquet or HDF5 file, see ResultWriter.
+
+    Returns:
+    the number of rows written
+    """
+    with ResultWriter(path, results.fl_channels, results.pixel_size, output_format, chunk_size) as writer:
+        writer.write_results(results)
+    return writer.rows
@@ -1,11 +1,79 @@
-import numpy as np
-from .ellipse import Ellipse
-
-class Fluorescence:
-    def __init__(self, img: np.ndarray, ellipse: Ellipse):
-        height, width = img.shape
-        mask = ellipse.get_mask(height, width)
-        pixels_inside_ellipse = img[mask]
-        self.mean = np.mean(pixels_inside_ellipse)
-        self.sd = np.std(pixels_inside_ellipse)
-        self.median = np.median(pixels_inside_ellipse)
+import numpy as np
+from .ellipse import Ellipse
+
+class Fluorescence:
+    # percentiles reported in addition to the median
+    PERCENTILES = (5, 25, 75, 95)
+
+    def __init__(self, img: np.ndarray, ellipse: Ellipse):
+        height, width = img.shape
+        rows, cols = ellipse.get_mask_indices(height, width)
+        pixels_inside_ellipse = img[rows, cols]
+        self.set_statistics(pixels_inside_ellipse[np.newaxis, :], 0)
+
+    def set_statistics(self, pixels, index, statistics=None):
+        # pixels is a (channels x pixels) block, statistics may hold the precomputed values for all channels
+        if statistics is None:
+            statistics = Fluorescence.get_statistics(pixels)
+
+        self.n_pixels = pixels.shape[1]
+        self.mean = statistics['mean'][index]
+        self.sd = statistics['sd'][index]
+        self.median = statistics['median'][index]
+        self.integrated = statistics['integrated'][index]
+        self.percentiles = {p: statistics['percentiles'][i, index] for i, p in enumerate(Fluorescence.PERCENTILES)}
+
+    @staticmethod
+    def get_statistics(pixels):
+        # all statistics for a (channels x pixels) block, computed along the pixel axis
+        if pixels.shape[1] == 0:
+            # an empty mask, e.g. of a failed fit, has nan statistics
+            nan = np.full(len(pixels), np.nan)
+            return {
+                'mean': nan,
+                'sd': nan,
+                'median': nan,
+                'integrated': np.zeros(len(pixels)),
+                'percentiles': np.full((len(Fluorescence.PERCENTILES), len(pixels)), np.nan),
+            }
+
+        return {
+            'mean': np.mean(pixels, axis=1),
+            'sd': np.std(pixels, axis=1),
+            'median': np.median(pixels, axis=1),
+            'integrated': np.sum(pixels, axis=1, dtype=np.float64),
+            'percentiles': np.percentile(pixels, Fluorescence.PERCENTILES, axis=1),
+        }
+
+    @classmethod
+    def measure_channels(cls, img: np.ndarray, frame, channels, ellipse: Ellipse, backend='numpy'):
+        """
+        Measure the fluorescence of several channels at once.
+
+        The mask is built once and all channels are gathered in a single indexed read
+        as a (channels x pixels) block.
+
+        Parameters:
+        img (4D array): image stack with shape (frames, channels, height, width)
+        frame (int): frame index
+        channels (list of int): fluorescence channels to measure
+        ellipse (Ellipse): the fitted cell outline
+        backend (str): 'numpy', 'numba' or 'auto', the backend of the mask, the statistics are always
+        computed with numpy
+
+        Returns:
+        list of Fluorescence, one per channel
+        """
+        channels = np.asarray(channels, dtype=np.intp)
+        rows, cols = ellipse.get_mask_indices(img.shape[2], img.shape[3], backend)
+
+        pixels = img[frame, channels[:, np.newaxis], rows[np.newaxis, :], cols[np.newaxis, :]]
+        statistics = cls.get_statistics(pixels)
+
+        measurements = []
+        for i in range(len(channels)):
+            fluorescence = cls.__new__(cls)
+            fluorescence.set_statistics(pixels, i, statistics)
+            measurements.append(fluorescence)
+
+        return measurements
@@ -0,0 +1,55 @@
+import numpy as np
+from collections import OrderedDict
+from .edge import estimate_background
+
+def fast_median(values):
+    """
+    Median of an array, using a histogram instead of a sort for 8 and 16 bit integer data.
+    Returns the same value as np.median.
+    """
+    values = np.asarray(values).ravel()
+
+    if values.size == 0 or values.dtype.kind not in 'ui' or values.dtype.itemsize > 2:
+        return np.median(values)
+
+    # shift signed data so that the smallest possible value maps to bin 0
+    offset = int(np.iinfo(values.dtype).min)
+    counts = np.bincount((values.astype(np.int32) - offset) if offset else values, minlength=1)
+    cumulative = np.cumsum(counts)
+
+    # the two middle elements of the sorted data, equal when the size is odd
+    n = values.size
+    lower = np.searchsorted(cumulative, (n - 1) // 2, side='right') + offset
+    upper = np.searchsorted(cumulative, n // 2, side='right') + offset
+
+    return np.float64(lower + upper) / 2
+
+class FrameStatistics:
+    """
+    Per (frame, channel) cache of image statistics that are shared by all cells in a frame,
+    with least recently used eviction.
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._backgrounds = OrderedDict()
+
+    def get_background(self, img, frame, channel):
+        key = (frame, channel)
+
+        if key in self._backgrounds:
+            self._backgrounds.move_to_end(key)
+            return self._backgrounds[key]
+
+        background = estimate_background(img[frame, channel], median=fast_median)
+
+        self._backgrounds[key] = background
+        if len(self._backgrounds) > self.max_size:
+            self._backgrounds.popitem(last=False)
+
+        return background
+
+    def clear(self):
+        self._backgrounds.clear()
+
+    def __len__(self):
+        return len(self._backgrounds)
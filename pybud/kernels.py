@@ -0,0 +1,164 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# 'numpy' runs the array code in edge and ellipse, 'numba' the compiled kernels below,
+# 'auto' the kernels when numba is installed
+BACKENDS = ['numpy', 'numba', 'auto']
+
+def numba_available():
+    return numba is not None
+
+def resolve_backend(backend):
+    """
+    The backend that runs the kernels, 'numpy' or 'numba'.
+
+    Raises ValueError for an unknown backend and ImportError when 'numba' is requested
+    but numba is not installed, 'auto' falls back to 'numpy'.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Invalid backend. Choose 'numpy', 'numba' or 'auto'.")
+    if backend == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    if backend == 'numba' and numba is None:
+        raise ImportError("The numba backend requires numba.")
+    return backend
+
+def _jit(function):
+    # compiled on first use and cached on disk, the kernels release the GIL so threads can run them
+    # in parallel, and divide by zero like numpy instead of raising
+    if numba is None:
+        return function
+    return numba.njit(nogil=True, cache=True, error_model='numpy')(function)
+
+@_jit
+def _search_rays(plane, x, y, dx, dy, start, length, background, edge_size, edge_rel_min):
+    # sample_rays and search_edges fused into one pass over every ray, without the (n, 360, radius) temporaries
+    n_seeds = x.shape[0]
+    n_angles = dx.shape[0]
+    img_height, img_width = plane.shape
+
+    found = np.zeros((n_seeds, n_angles), dtype=np.bool_)
+    found_x = np.zeros((n_seeds, n_angles))
+    found_y = np.zeros((n_seeds, n_angles))
+    max_dif = np.zeros((n_seeds, n_angles))
+    edge = np.zeros((n_seeds, n_angles), dtype=np.int64)
+
+    # windows never reach the last sample of a ray
+    n_windows = length - edge_size
+    if n_windows <= 0:
+        return found, found_x, found_y, max_dif, edge
+
+    ray_x = np.empty(length, dtype=np.int32)
+    ray_y = np.empty(length, dtype=np.int32)
+    profile = np.empty(length)
+
+    for i in range(n_seeds):
+        for angle in range(n_angles):
+            first = start[i, angle]
+            for j in range(length):
+                # truncated like the astype(np.int32) in sample_rays
+                rx = np.int32(x[i] + dx[angle, first + j])
+                ry = np.int32(y[i] + dy[angle, first + j])
+                ray_x[j] = rx
+                ray_y[j] = ry
+                if rx >= 0 and rx < img_width and ry >= 0 and ry < img_height:
+                    profile[j] = plane[ry, rx]
+                else:
+                    profile[j] = background
+
+            # the first window with the largest qualifying difference
+            best = -1
+            best_dif = 0.0
+            for w in range(n_windows):
+                high = profile[w]
+                low = profile[w]
+                for k in range(w + 1, w + edge_size):
+                    high = max(high, profile[k])
+                    low = min(low, profile[k])
+                dif = high - low
+                if (100 * dif) / background > edge_rel_min and dif > best_dif:
+                    best = w
+                    best_dif = dif
+
+            if best < 0:
+                continue
+
+            # the first maximum and minimum within that window
+            arg_max = 0
+            arg_min = 0
+            for k in range(1, edge_size):
+                if profile[best + k] > profile[best + arg_max]:
+                    arg_max = k
+                if profile[best + k] < profile[best + arg_min]:
+                    arg_min = k
+
+            limit_ptr = best + (arg_max + arg_min) // 2
+            found[i, angle] = True
+            found_x[i, angle] = ray_x[limit_ptr]
+            found_y[i, angle] = ray_y[limit_ptr]
+            max_dif[i, angle] = best_dif
+            edge[i, angle] = arg_max - arg_min
+
+    return found, found_x, found_y, max_dif, edge
+
+def search_rays(plane, x, y, dx, dy, background, edge_size, edge_rel_min, start=None, length=None):
+    """
+    Compiled version of sample_rays followed by search_edges, with the same results.
+
+    Parameters:
+    plane (2D array): brightfield image of a single frame and channel
+    x, y (1D arrays): seed coordinates in pixels
+    dx, dy (int arrays of shape (360, cell_radius + 1)): the offset table of ray_offsets
+    background, edge_size, edge_rel_min: see search_edges
+    start, length: optional band of every ray, see sample_rays
+
+    Returns:
+    found (bool array of shape (n, 360)), found_x, found_y (float arrays), max_dif (float array)
+    and edge (int array)
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if start is None:
+        start = np.zeros((len(x), dx.shape[0]), dtype=np.intp)
+        length = dx.shape[1]
+    start = np.ascontiguousarray(start, dtype=np.intp)
+    return _search_rays(np.asarray(plane), x, y, dx, dy, start, int(length), float(background), int(edge_size), float(edge_rel_min))
+
+@_jit
+def _ellipse_mask(x0, x1, y0, y1, x_center, y_center, cos_angle, sin_angle, major, minor):
+    # row major over the bounding box, the order of np.nonzero
+    rows = np.empty((y1 - y0) * (x1 - x0), dtype=np.int64)
+    cols = np.empty((y1 - y0) * (x1 - x0), dtype=np.int64)
+    n = 0
+    for row in range(y0, y1):
+        y = row - y_center
+        for col in range(x0, x1):
+            x = col - x_center
+            x_rot = x * cos_angle + y * sin_angle
+            y_rot = -x * sin_angle + y * cos_angle
+            if (x_rot / major) ** 2 + (y_rot / minor) ** 2 <= 1:
+                rows[n] = row
+                cols[n] = col
+                n += 1
+    return rows[:n].copy(), cols[:n].copy()
+
+def ellipse_mask(bounding_box, x_center, y_center, angle, major, minor):
+    """
+    Compiled version of Ellipse.get_mask_indices, with the same indices in the same order.
+
+    Parameters:
+    bounding_box (tuple): x0, x1, y0, y1 as returned by Ellipse.get_bounding_box
+    x_center, y_center, major, minor (float): the ellipse in pixels, major and minor are semi-axes
+    angle (float): the angle of the major axis in degrees
+
+    Returns:
+    rows, cols (int arrays)
+    """
+    x0, x1, y0, y1 = (int(v) for v in bounding_box)
+    cos_angle = np.cos(np.radians(angle))
+    sin_angle = np.sin(np.radians(angle))
+    return _ellipse_mask(x0, x1, y0, y1, float(x_center), float(y_center), float(cos_angle), float(sin_angle), float(major), float(minor))
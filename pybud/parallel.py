@@ -0,0 +1,124 @@
+import mmap
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# state of a worker process, set up once by init_worker
+_worker = {}
+
+class SharedStack:
+    """
+    Makes an image stack available to worker processes without pickling it for every task.
+
+    Memory-mapped stacks are reopened from their file by the workers, other arrays are copied
+    once into a shared memory block. Objects that are not NumPy arrays are passed as they are,
+    so they should be cheap to pickle.
+    """
+    def __init__(self, img):
+        self.shm = None
+
+        if isinstance(img, np.memmap) and img.filename is not None and isinstance(img.base, mmap.mmap):
+            order = 'C' if img.flags.c_contiguous else 'F'
+            self.spec = ('memmap', img.filename, img.dtype.str, img.offset, img.shape, order)
+        elif isinstance(img, np.ndarray):
+            self.shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+            shared = np.ndarray(img.shape, dtype=img.dtype, buffer=self.shm.buf)
+            shared[...] = img
+            self.spec = ('shared_memory', self.shm.name, img.dtype.str, img.shape)
+        else:
+            self.spec = ('object', img)
+
+    @staticmethod
+    def attach(spec):
+        # returns the stack and the handle that must be kept alive while the stack is in use
+        if spec[0] == 'memmap':
+            _, filename, dtype, offset, shape, order = spec
+            return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape, order=order), None
+        if spec[0] == 'shared_memory':
+            _, name, dtype, shape = spec
+            shm = shared_memory.SharedMemory(name=name)
+            return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+        return spec[1], None
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def init_worker(spec, settings, instrument=False):
+    from .pybud import PyBud
+
+    img, handle = SharedStack.attach(spec)
+
+    pybud = PyBud()
+    pybud.set_settings(settings)
+    pybud.img = img
+    pybud.instrument = instrument
+
+    _worker['pybud'] = pybud
+    _worker['handle'] = handle
+
+def fit_track_task(track):
+    # cells are returned without their image (see Cell.__getstate__),
+    # together with the statistics of the track when they are collected
+    from .stats import RunStatistics
+
+    pybud = _worker['pybud']
+    pybud.statistics = RunStatistics() if pybud.instrument else None
+    return pybud.fit_track(*track), pybud.statistics
+
+def iter_tracks_parallel(pybud, tracks, max_workers):
+    """
+    Fit tracks in a process pool and yield the cells of every track, in the order of tracks.
+
+    Only a limited number of tracks is submitted ahead of the one being yielded, so results
+    do not pile up when the consumer is slower than the workers. Cancellation (see
+    PyBud.is_cancelled) is checked between tracks, tracks that are already running still finish.
+
+    Parameters:
+    pybud (PyBud): provides the image stack and the settings
+    tracks (list): (cell_id, start_frame, x, y) tuples
+    max_workers (int): maximum number of worker processes
+    """
+    with SharedStack(pybud.img) as stack:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(stack.spec, pybud.get_settings(), pybud.statistics is not None)) as executor:
+            pending = deque()
+            tracks = iter(tracks)
+
+            for track in tracks:
+                pending.append((track, executor.submit(fit_track_task, track)))
+                if len(pending) >= 2 * max_workers:
+                    break
+
+            while pending:
+                if pybud.is_cancelled():
+                    for _, future in pending:
+                        future.cancel()
+                    return
+
+                track, future = pending.popleft()
+                cells, statistics = future.result()
+                if pybud.statistics is not None:
+                    pybud.statistics.merge(statistics)
+                pybud.advance_progress(pybud.img.shape[0] - track[1])
+
+                # keep the pool busy while the results are consumed
+                track = next(tracks, None)
+                if track is not None:
+                    pending.append((track, executor.submit(fit_track_task, track)))
+
+                for cell in cells:
+                    cell.img = pybud.img
+                yield cells
+
+def fit_tracks_parallel(pybud, tracks, max_workers):
+    # the cells of every track, in the order of tracks
+    return list(iter_tracks_parallel(pybud, tracks, max_workers))
@@ -0,0 +1,36 @@
+class Progress:
+    """
+    Progress and cancellation of a fit_cells run, counted in track frames.
+
+    Every track counts the frames from its start frame to the end of the stack, so the total is
+    known before the run starts. A lost track counts all of its remaining frames at once.
+
+    Parameters:
+    total (int): the number of track frames of the run
+    callback (callable): called with (done, total) whenever the progress advanced
+    cancel (callable): returns True when the run should stop, checked between frames
+    """
+    def __init__(self, total, callback=None, cancel=None):
+        self.total = total
+        self.done = 0
+        self.callback = callback
+        self.cancel = cancel
+        self.cancelled = False
+
+    @classmethod
+    def for_tracks(cls, tracks, n_frames, callback=None, cancel=None):
+        # tracks are (cell_id, start_frame, x, y[, previous]) tuples
+        return cls(sum(n_frames - track[1] for track in tracks), callback, cancel)
+
+    def advance(self, frames=1):
+        if frames <= 0:
+            return
+        self.done = min(self.done + frames, self.total)
+        if self.callback is not None:
+            self.callback(self.done, self.total)
+
+    def is_cancelled(self):
+        # once cancelled, a run stays cancelled
+        if not self.cancelled and self.cancel is not None:
+            self.cancelled = bool(self.cancel())
+        return self.cancelled
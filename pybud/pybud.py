@@ -1,65 +1,503 @@
-import numpy as np
-import numpy.typing as npt
-from typing import List
-from .cell import Cell
-
-class PyBud:
-
-    def __init__(self, fitting_method='algebraic', selection_radius=10):
-        self.fitting_method = fitting_method
-        self.selection_radius = selection_radius
-        
-        self.cells: List[Cell] = []
-        self.selections = {}
-
-        self.img = None
-        self.pixel_size = 0.0645
-        self.bf_channel = 0
-        self.fl_channels = [1]
-        self.cell_radius = 4
-        self.edge_size = 1
-        self.edge_rel_min = 30
-
-    def contains_selection(self, frame, x, y):
-        if frame in self.selections:
-            for i, (sx, sy) in enumerate(self.selections[frame]):
-                if np.hypot(sx - x, sy - y) <= self.selection_radius:  # Check distance
-                    return True
-        return False
-
-    def add_selection(self, frame, x, y):
-        if frame not in self.selections:
-            self.selections[frame] = []
-        self.selections[frame].append((x, y))
-
-    def remove_selection(self, frame, x, y):
-        if frame in self.selections:
-            for i, (sx, sy) in enumerate(self.selections[frame]):
-                if np.hypot(sx - x, sy - y) <= self.selection_radius:  # Check distance
-                    del self.selections[frame][i]
-                    return True
-        return False
-    
-    def clear(self):
-        self.selections.clear()
-        self.cells.clear()
-
-    def fit_cells(self):
-        self.cells = []
-
-        cell_id = 1
-        for start_frame, coordinates in self.selections.items():
-            for x, y in coordinates:
-                for frame in range(start_frame, self.img.shape[0]):
-
-                    cell = Cell(self.img, self.pixel_size, self.bf_channel, self.fl_channels, frame, x, y, cell_id, int(np.ceil(self.cell_radius / self.pixel_size)), int(np.ceil(self.edge_size / self.pixel_size)), self.edge_rel_min, fitting_method=self.fitting_method)
-
-                    if cell.cell_found:
-                        self.cells.append(cell)
-                        x = cell.ellipse.get_x_center()
-                        y = cell.ellipse.get_y_center()
-                        print(f"cell found on channel {self.bf_channel} at frame {frame} x {x} y {y}")
-                    else:
-                        break
-                cell_id += 1
-
+import logging
+import numpy as np
+import numpy.typing as npt
+from typing import List
+from scipy.spatial import cKDTree
+from .cell import Cell
+from .ellipse import Ellipse, fit_algebraic_ellipses
+from .edge import find_cell_edges
+from .framestats import FrameStatistics
+from .parallel import iter_tracks_parallel
+from .stack import as_stack
+from .results import ResultTable
+from .checkpoint import Checkpoint
+from .seeds import detect_seeds
+from .selections import Selections
+from .rois import read_point_rois
+from .stats import RunStatistics, stage_timer
+from .progress import Progress
+
+logger = logging.getLogger(__name__)
+
+class PyBud:
+
+    def __init__(self, fitting_method='algebraic', selection_radius=10):
+        self.fitting_method = fitting_method
+        self.selection_radius = selection_radius
+        
+        self.cells: List[Cell] = []
+        self.selections = Selections()
+
+        # statistics shared by all cells in a frame, reset when the image or channel changes
+        self.frame_stats = FrameStatistics()
+
+        self._img = None
+        self._bf_channel = 0
+        self.pixel_size = 0.0645
+        self.fl_channels = [1]
+        self.cell_radius = 4
+        self.edge_size = 1
+        self.edge_rel_min = 30
+        self.edge_engine = 'vectorized'
+
+        # 'numba' runs the ray search and the fluorescence masks in compiled kernels with the same
+        # results, 'auto' does so when numba is installed
+        self.backend = 'numpy'
+
+        # geometric fits start from the ellipse of the previous frame of a track when warm_start is set,
+        # fit_max_nfev (None for no limit) and fit_tolerance bound the least squares iterations.
+        # Warm started fits start from canonical parameters and report their angle within a half
+        # turn, while cold fits do not normalize it, so warm starts are off by default
+        self.warm_start = False
+        self.fit_max_nfev = None
+        self.fit_tolerance = 1e-8
+
+        # incremental tracking searches the edges only within tracking_band (in micrometers) of the
+        # previous ellipse of a track, falling back to the full search when the cell is not found
+        self.incremental_tracking = False
+        self.tracking_band = 0.5
+
+        # number of processes used by fit_cells, 1 fits all tracks in this process
+        self.max_workers = 1
+
+        # fit_cells stores every result in self.results, set keep_cells to False to save memory
+        # on large runs, keep_diagnostics also stores the edge points of every cell in the table
+        self.keep_cells = True
+        self.keep_diagnostics = False
+        self.results = ResultTable(self.fl_channels, self.pixel_size)
+
+        # seconds between two saves of the checkpoint of fit_cells
+        self.checkpoint_interval = 60.0
+
+        # with instrument set, fit_cells collects stage timings, ray counts and the reason every track
+        # stopped in self.statistics, statistics_callback is called with them whenever a track stops
+        self.instrument = False
+        self.statistics_callback = None
+        self.statistics = None
+
+        # progress and cancellation hooks of the current fit_cells run, see Progress
+        self.progress = None
+
+    @property
+    def img(self):
+        return self._img
+
+    @img.setter
+    def img(self, img):
+        # 3D stacks (frames, height, width) are viewed as a single channel, without copying
+        self._img = as_stack(img)
+        self.frame_stats.clear()
+
+    @property
+    def bf_channel(self):
+        return self._bf_channel
+
+    @bf_channel.setter
+    def bf_channel(self, bf_channel):
+        if bf_channel != self._bf_channel:
+            self.frame_stats.clear()
+        self._bf_channel = bf_channel
+
+    def get_background(self, frame):
+        with stage_timer(self.statistics, 'background'):
+            return self.frame_stats.get_background(self.img, frame, self.bf_channel)
+
+    def contains_selection(self, frame, x, y):
+        return len(self.selections.within(frame, x, y, self.selection_radius)) > 0
+
+    def add_selection(self, frame, x, y):
+        self.selections.add(frame, [(x, y)])
+
+    def add_selections(self, frame, coordinates):
+        """
+        Add many selections to a frame at once, skipping coordinates within selection_radius of
+        an existing selection or of an earlier coordinate.
+
+        Returns:
+        - The number of selections that were added.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        _, distance = self.selections.nearest(frame, coordinates[:, 0], coordinates[:, 1])
+        coordinates = coordinates[distance > self.selection_radius]
+
+        # of coordinates that are close to each other, the first one is kept
+        keep = np.ones(len(coordinates), dtype=bool)
+        if len(coordinates) > 1:
+            for i, close in enumerate(cKDTree(coordinates).query_ball_point(coordinates, self.selection_radius)):
+                if keep[i]:
+                    keep[[j for j in close if j > i]] = False
+        coordinates = coordinates[keep]
+
+        if len(coordinates):
+            self.selections.add(frame, coordinates)
+        return len(coordinates)
+
+    def import_selections(self, path, deduplicate=True):
+        """
+        Add the points of an ImageJ point ROI zip as selections, in the frames of their t_position.
+
+        Parameters:
+        - path: The ROI zip or .roi file.
+        - deduplicate: Skip points within selection_radius of another selection, see add_selections.
+
+        Returns:
+        - The number of selections that were added.
+        """
+        frames, coordinates = read_point_rois(path)
+
+        added = 0
+        for frame in np.unique(frames).tolist():
+            points = coordinates[frames == frame]
+            if deduplicate:
+                added += self.add_selections(frame, points)
+            else:
+                self.selections.add(frame, points)
+                added += len(points)
+        return added
+
+    def remove_selections(self, frame, coordinates):
+        """
+        Remove all selections of a frame within selection_radius of any of the coordinates.
+
+        Returns:
+        - The number of selections that were removed.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        found = self.selections.within(frame, coordinates[:, 0], coordinates[:, 1], self.selection_radius)
+        indices = np.unique(np.concatenate(found)) if found else []
+        if len(indices):
+            self.selections.remove(frame, indices)
+        return len(indices)
+
+    def find_selections(self, frame, x, y, radius=None):
+        # indices of the selections of a frame within radius (selection_radius by default) of (x, y)
+        return self.selections.within(frame, x, y, self.selection_radius if radius is None else radius)
+
+    def nearest_selection(self, frame, x, y):
+        # index of and distance to the closest selection of a frame, -1 and inf if there is none
+        return self.selections.nearest(frame, x, y)
+
+    def detect_seeds(self, frame, threshold=3.0):
+        """
+        Propose cell centers in the brightfield image of a frame, see seeds.detect_seeds.
+
+        Returns:
+        - Array of shape (n, 2) with the x and y coordinates of the seeds in pixels.
+        """
+        return detect_seeds(self.img[frame, self.bf_channel], self.get_cell_radius_pixels(), threshold=threshold)
+
+    def add_detected_seeds(self, frame, threshold=3.0):
+        # detect the cells in a frame and select them, returns the number of new selections
+        return self.add_selections(frame, self.detect_seeds(frame, threshold))
+
+    def remove_selection(self, frame, x, y):
+        # removes the first selection within selection_radius
+        found = self.selections.within(frame, x, y, self.selection_radius)
+        if len(found):
+            self.selections.remove(frame, found[0])
+            return True
+        return False
+    
+    def clear(self):
+        self.selections.clear()
+        self.cells.clear()
+        self.results.clear()
+
+    def get_cell_radius_pixels(self):
+        return int(np.ceil(self.cell_radius / self.pixel_size))
+
+    def get_edge_size_pixels(self):
+        return int(np.ceil(self.edge_size / self.pixel_size))
+
+    def get_tracking_band_pixels(self):
+        return int(np.ceil(self.tracking_band / self.pixel_size))
+
+    def get_fit_options(self, previous=None):
+        """
+        Options of the geometric ellipse fit of a cell.
+
+        Parameters:
+        - previous: Parameters of the ellipse of the same cell in the previous frame, or None.
+        """
+        if self.fitting_method != 'geometric':
+            return {}
+
+        initial_guess = None
+        if self.warm_start:
+            # the first frame of a track starts from the algebraic solution
+            initial_guess = previous if previous is not None else 'algebraic'
+
+        return {'initial_guess': initial_guess, 'max_nfev': self.fit_max_nfev, 'tolerance': self.fit_tolerance}
+
+    def create_cell(self, frame, x, y, cell_id, edge=None, ellipse=None, previous=None):
+        return Cell(self.img, self.pixel_size, self.bf_channel, self.fl_channels, frame, x, y, cell_id, self.get_cell_radius_pixels(), self.get_edge_size_pixels(), self.edge_rel_min, fitting_method=self.fitting_method, edge_engine=self.edge_engine, backend=self.backend, edge=edge, background=self.get_background(frame), ellipse=ellipse, fit_options=self.get_fit_options(previous), statistics=self.statistics)
+
+    def find_cell_edges(self, frame, x, y, previous=None):
+        # detect the edges for all seed coordinates in a frame in one batched search,
+        # around the previous ellipses of the seeds when incremental tracking is enabled
+        plane = self.img[frame, self.bf_channel]
+        if not self.incremental_tracking:
+            previous = None
+        return find_cell_edges(plane, x, y, self.get_cell_radius_pixels(), self.get_edge_size_pixels(), self.edge_rel_min, self.get_background(frame), previous, self.get_tracking_band_pixels(), self.statistics, self.backend)
+
+    def fit_frame(self, frame, coordinates, cell_ids=None, previous=None):
+        """
+        Fit all cells of a single frame at once.
+
+        Parameters:
+        - frame: The frame index.
+        - coordinates: Sequence of (x, y) seed coordinates in pixels.
+        - cell_ids: Optional sequence of cell ids, one per coordinate.
+        - previous: Optional sequence of ellipse parameters (or None) from the previous frame,
+          one per coordinate, used as initial guess of geometric fits and for incremental tracking.
+
+        Returns:
+        - A list with one Cell per coordinate, check cell_found to see if the cell was found.
+        """
+        coordinates = list(coordinates)
+        if cell_ids is None:
+            cell_ids = [-1] * len(coordinates)
+        if previous is None:
+            previous = [None] * len(coordinates)
+
+        x = np.array([c[0] for c in coordinates])
+        y = np.array([c[1] for c in coordinates])
+        edges = self.find_cell_edges(frame, x, y, previous)
+        ellipses = [None] * len(edges)
+
+        # algebraic ellipses of all found cells are fitted in one batch
+        if self.fitting_method == 'algebraic':
+            found = [i for i, edge in enumerate(edges) if edge.cell_found]
+            if found:
+                found_x = np.array([edges[i].found_x for i in found])
+                found_y = np.array([edges[i].found_y for i in found])
+                pixel_found = np.array([edges[i].pixel_found for i in found])
+                with stage_timer(self.statistics, 'ellipse_fit'):
+                    params = fit_algebraic_ellipses(found_x, found_y, pixel_found)
+
+                for i, p, fx, fy, pf in zip(found, params, found_x, found_y, pixel_found):
+                    # invalid fits are left to Cell, which reports the same fit error as in track order
+                    if np.all(np.isfinite(p)):
+                        ellipses[i] = Ellipse.from_params(fx[pf], fy[pf], p, method='algebraic')
+
+        return [self.create_cell(frame, edge.x_selected, edge.y_selected, cell_id, edge=edge, ellipse=ellipse, previous=params) for edge, cell_id, ellipse, params in zip(edges, cell_ids, ellipses, previous)]
+
+    def get_settings(self):
+        # the measurement settings, e.g. to configure worker processes
+        return {
+            'fitting_method': self.fitting_method,
+            'pixel_size': self.pixel_size,
+            'bf_channel': self.bf_channel,
+            'fl_channels': list(self.fl_channels),
+            'cell_radius': self.cell_radius,
+            'edge_size': self.edge_size,
+            'edge_rel_min': self.edge_rel_min,
+            'edge_engine': self.edge_engine,
+            'backend': self.backend,
+            'warm_start': self.warm_start,
+            'fit_max_nfev': self.fit_max_nfev,
+            'fit_tolerance': self.fit_tolerance,
+            'incremental_tracking': self.incremental_tracking,
+            'tracking_band': self.tracking_band,
+        }
+
+    def set_settings(self, settings):
+        for name, value in settings.items():
+            if name not in self.get_settings():
+                raise ValueError(f"Unknown setting '{name}'.")
+            setattr(self, name, value)
+
+    def get_tracks(self):
+        # every selection starts a track, cell ids are assigned in selection order
+        tracks = []
+        cell_id = 1
+        for start_frame, coordinates in self.selections.items():
+            for x, y in coordinates:
+                tracks.append((cell_id, start_frame, float(x), float(y)))
+                cell_id += 1
+        return tracks
+
+    def iter_track(self, cell_id, start_frame, x, y, previous=None):
+        # follow a single cell from its start frame until it is lost,
+        # previous is the ellipse of the frame before start_frame when a track is resumed
+        for frame in range(start_frame, self.img.shape[0]):
+
+            if self.is_cancelled():
+                return
+
+            edge = None
+            if self.incremental_tracking and previous is not None:
+                edge = self.find_cell_edges(frame, [x], [y], [previous])[0]
+
+            cell = self.create_cell(frame, x, y, cell_id, edge=edge, previous=previous)
+
+            if not cell.cell_found:
+                self.end_track(cell_id, frame, cell.status)
+                self.advance_progress(self.img.shape[0] - frame)
+                break
+
+            x = cell.ellipse.get_x_center()
+            y = cell.ellipse.get_y_center()
+            previous = cell.ellipse.params
+            self.add_cell_statistics(cell)
+            self.advance_progress()
+            yield cell
+        else:
+            self.end_track(cell_id, self.img.shape[0] - 1, 'end_of_stack')
+
+    def add_cell_statistics(self, cell):
+        logger.debug("cell %d found on channel %d at frame %d x %.2f y %.2f", cell.id, self.bf_channel, cell.frame, cell.ellipse.get_x_center(), cell.ellipse.get_y_center())
+        if self.statistics is not None:
+            self.statistics.add_cell(cell)
+
+    def end_track(self, cell_id, frame, reason):
+        logger.debug("track of cell %d stopped at frame %d: %s", cell_id, frame, reason)
+        if self.statistics is not None:
+            self.statistics.end_track(cell_id, frame, reason)
+
+    def advance_progress(self, frames=1):
+        if self.progress is not None:
+            self.progress.advance(frames)
+
+    def is_cancelled(self):
+        return self.progress is not None and self.progress.is_cancelled()
+
+    def fit_track(self, cell_id, start_frame, x, y, previous=None):
+        return list(self.iter_track(cell_id, start_frame, x, y, previous))
+
+    def iter_frames(self, tracks):
+        # follow all tracks frame by frame, fitting all cells of a frame in one batched search,
+        # resumed tracks carry the ellipse of their previous frame as fifth element
+        tracks = sorted(tracks, key=lambda track: (track[1], track[0]))
+        active = []
+        next_track = 0
+
+        for frame in range(tracks[0][1] if tracks else 0, self.img.shape[0]):
+
+            if self.is_cancelled():
+                return
+
+            # start the tracks that begin at this frame
+            while next_track < len(tracks) and tracks[next_track][1] == frame:
+                cell_id, _, x, y = tracks[next_track][:4]
+                previous = tracks[next_track][4] if len(tracks[next_track]) > 4 else None
+                active.append((cell_id, x, y, previous))
+                next_track += 1
+
+            if not active:
+                if next_track == len(tracks):
+                    break
+                continue
+
+            active.sort(key=lambda track: track[0])
+            cells = self.fit_frame(frame, [(x, y) for _, x, y, _ in active], [cell_id for cell_id, _, _, _ in active], [previous for _, _, _, previous in active])
+
+            active = []
+            for cell in cells:
+                if cell.cell_found:
+                    x = cell.ellipse.get_x_center()
+                    y = cell.ellipse.get_y_center()
+                    active.append((cell.id, x, y, cell.ellipse.params))
+                    self.add_cell_statistics(cell)
+                    self.advance_progress()
+                    yield cell
+                else:
+                    self.end_track(cell.id, frame, cell.status)
+                    self.advance_progress(self.img.shape[0] - frame)
+
+        for cell_id, _, _, _ in active:
+            self.end_track(cell_id, self.img.shape[0] - 1, 'end_of_stack')
+
+    def iter_fit_cells(self, order='track', tracks=None, progress=None, cancel=None):
+        """
+        Fit all selected cells and yield every cell as soon as it has been fitted.
+
+        Unlike fit_cells, the cells are not kept in self.cells, so the results can be
+        processed incrementally with bounded memory.
+
+        Parameters:
+        - order: 'track' yields all frames of a cell before moving to the next cell (the order
+          of fit_cells), 'frame' yields all cells of a frame before moving to the next frame.
+          Frame order fits all cells of a frame with one batched edge search, see fit_frame.
+        - tracks: The tracks to fit, by default all selections (see get_tracks).
+        - progress: Optional callable, called with (done, total) track frames as the run advances.
+        - cancel: Optional callable that returns True to stop the run. It is checked between frames,
+          with max_workers > 1 between tracks, and the cells fitted so far are kept.
+
+        Yields:
+        - The fitted Cell objects.
+        """
+        if order not in ['track', 'frame']:
+            raise ValueError("Invalid order. Choose 'track' or 'frame'.")
+        if tracks is None:
+            tracks = self.get_tracks()
+
+        self.statistics = RunStatistics(self.statistics_callback) if self.instrument else None
+        self.progress = Progress.for_tracks(tracks, self.img.shape[0], progress, cancel)
+
+        if order == 'frame':
+            yield from self.iter_frames(tracks)
+        elif self.max_workers > 1 and len(tracks) > 1:
+            # tracks are independent, so they can be fitted in separate processes
+            for cells in iter_tracks_parallel(self, tracks, min(self.max_workers, len(tracks))):
+                yield from cells
+        else:
+            for track in tracks:
+                yield from self.iter_track(*track)
+
+        if self.progress.cancelled:
+            logger.info("fit_cells cancelled after %d of %d track frames", self.progress.done, self.progress.total)
+
+        if self.statistics is not None:
+            self.statistics.finish()
+            logger.info("fit_cells finished: %s", self.statistics)
+
+    def fit_cells(self, order='track', checkpoint=None, progress=None, cancel=None):
+        """
+        Fit all selected cells. The results are always stored in the compact self.results table,
+        the cells themselves are only kept in self.cells when keep_cells is set.
+
+        Parameters:
+        - order: 'track' or 'frame', see iter_fit_cells.
+        - checkpoint: Optional path of a checkpoint file. The progress is saved to it every
+          checkpoint_interval seconds and at the end of the run. When the file exists, the run is
+          resumed from it: finished tracks are skipped and the other tracks continue after their
+          last fitted frame. Rows restored from the checkpoint are only added to self.results.
+        - progress, cancel: Optional progress and cancellation hooks, see iter_fit_cells. A cancelled
+          run keeps the cells fitted so far, its checkpoint can be resumed.
+
+        Returns:
+        - The RunStatistics of the run when instrument is set, otherwise None.
+        """
+        self.results = ResultTable(self.fl_channels, self.pixel_size, self.keep_diagnostics)
+        self.cells = []
+        tracks = self.get_tracks()
+
+        if checkpoint is not None:
+            checkpoint = Checkpoint(checkpoint, self.checkpoint_interval)
+            tracks = checkpoint.resume(tracks, self.get_settings(), self.results, self.img.shape[0])
+
+        # in track order, every track before the one of the current cell is finished
+        position = {track[0]: i for i, track in enumerate(tracks)}
+        finished = 0
+
+        for cell in self.iter_fit_cells(order, tracks, progress, cancel):
+            self.results.append_cell(cell)
+            if self.keep_cells:
+                self.cells.append(cell)
+
+            if checkpoint is not None:
+                if order == 'track':
+                    while finished < position[cell.id]:
+                        checkpoint.mark_done(tracks[finished][0])
+                        finished += 1
+                checkpoint.update(cell)
+                checkpoint.maybe_save(self.results)
+
+        if checkpoint is not None:
+            if not self.progress.cancelled:
+                for track in tracks:
+                    checkpoint.mark_done(track[0])
+            checkpoint.save(self.results)
+
+        return self.statistics
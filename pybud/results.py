@@ -0,0 +1,189 @@
+import numpy as np
+from .fluorescence import Fluorescence
+
+class ResultTable:
+    """
+    Compact columnar store for fitted cells.
+
+    Every column is a typed NumPy array that grows geometrically, so appending is amortized O(1)
+    and no Cell objects (with their image, diagnostic arrays and ellipse) have to be kept alive.
+    Rows are indexed by frame and by cell id for O(1) lookups.
+
+    Lengths are in micrometers, except for the pixel based ellipse columns (x_center, y_center,
+    major_axis and minor_axis), which hold the ellipse in image coordinates.
+    """
+
+    # name, dtype
+    COLUMNS = [
+        ('cell_id', np.int32),
+        ('frame', np.int32),
+        ('x_selected', np.float64),
+        ('y_selected', np.float64),
+        ('x_center', np.float64),
+        ('y_center', np.float64),
+        ('major_axis', np.float64),
+        ('minor_axis', np.float64),
+        ('x_centroid', np.float64),
+        ('y_centroid', np.float64),
+        ('major', np.float64),
+        ('minor', np.float64),
+        ('angle', np.float64),
+        ('volume', np.float64),
+        ('edge_width', np.float64),
+    ]
+
+    # per channel statistics, stored as (rows, channels) arrays
+    CHANNEL_COLUMNS = ['fl_mean', 'fl_sd', 'fl_median', 'fl_integrated']
+
+    # edge detection diagnostics, stored as (rows, 360) arrays when requested
+    DIAGNOSTIC_COLUMNS = [
+        ('pixel_found', np.bool_),
+        ('found_x', np.float64),
+        ('found_y', np.float64),
+        ('found_rad', np.float64),
+        ('found_dif', np.float64),
+        ('found_edge', np.float64),
+        ('found_slope', np.float64),
+    ]
+
+    def __init__(self, fl_channels=(), pixel_size=1.0, keep_diagnostics=False, capacity=1024):
+        self.fl_channels = list(fl_channels)
+        self.pixel_size = pixel_size
+        self.keep_diagnostics = keep_diagnostics
+
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._columns = {}
+        self._by_frame = {}
+        self._by_cell = {}
+
+        n_channels = len(self.fl_channels)
+        for name, dtype in self.COLUMNS:
+            self._columns[name] = np.zeros(self._capacity, dtype=dtype)
+        for name in self.CHANNEL_COLUMNS:
+            self._columns[name] = np.zeros((self._capacity, n_channels))
+        self._columns['fl_percentiles'] = np.zeros((self._capacity, n_channels, len(Fluorescence.PERCENTILES)))
+        if keep_diagnostics:
+            for name, dtype in self.DIAGNOSTIC_COLUMNS:
+                self._columns[name] = np.zeros((self._capacity, 360), dtype=dtype)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        # a view on the filled part of a column
+        return self._columns[name][:self._size]
+
+    def column_names(self):
+        return list(self._columns)
+
+    def _reserve(self, size):
+        if size <= self._capacity:
+            return
+
+        capacity = max(2 * self._capacity, size)
+        for name, column in self._columns.items():
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append_cell(self, cell):
+        """
+        Append a fitted Cell and return its row index.
+        """
+        if list(cell.fl_channels) != self.fl_channels:
+            raise ValueError("The fluorescence channels of the cell do not match the table.")
+
+        self._reserve(self._size + 1)
+        row = self._size
+        columns = self._columns
+        ellipse = cell.ellipse
+
+        columns['cell_id'][row] = cell.id
+        columns['frame'][row] = cell.frame
+        columns['x_selected'][row] = cell.x_selected
+        columns['y_selected'][row] = cell.y_selected
+        columns['x_center'][row] = ellipse.get_x_center()
+        columns['y_center'][row] = ellipse.get_y_center()
+        columns['major_axis'][row] = ellipse.get_major()
+        columns['minor_axis'][row] = ellipse.get_minor()
+        columns['x_centroid'][row] = cell.x_centroid
+        columns['y_centroid'][row] = cell.y_centroid
+        columns['major'][row] = cell.major
+        columns['minor'][row] = cell.minor
+        columns['angle'][row] = cell.angle
+        columns['volume'][row] = cell.volume
+        columns['edge_width'][row] = cell.edge_width
+
+        for i, fluorescence in enumerate(cell.fluorescence):
+            columns['fl_mean'][row, i] = fluorescence.mean
+            columns['fl_sd'][row, i] = fluorescence.sd
+            columns['fl_median'][row, i] = fluorescence.median
+            columns['fl_integrated'][row, i] = fluorescence.integrated
+            columns['fl_percentiles'][row, i] = [fluorescence.percentiles[p] for p in Fluorescence.PERCENTILES]
+
+        if self.keep_diagnostics:
+            for name, _ in self.DIAGNOSTIC_COLUMNS:
+                columns[name][row] = getattr(cell, name)
+
+        self._by_frame.setdefault(int(cell.frame), []).append(row)
+        self._by_cell.setdefault(int(cell.id), []).append(row)
+        self._size += 1
+
+        return row
+
+    def extend(self, cells):
+        for cell in cells:
+            self.append_cell(cell)
+
+    def append_columns(self, columns):
+        """
+        Append the rows of another table, given as a dictionary with all of its columns,
+        e.g. as saved by Checkpoint.
+        """
+        if sorted(columns) != sorted(self._columns):
+            raise ValueError("The columns do not match the table.")
+
+        size = len(columns['cell_id'])
+        for name, column in columns.items():
+            if column.shape != (size,) + self._columns[name].shape[1:]:
+                raise ValueError(f"The shape of column '{name}' does not match the table.")
+
+        self._reserve(self._size + size)
+        for name, column in columns.items():
+            self._columns[name][self._size:self._size + size] = column
+
+        for row in range(self._size, self._size + size):
+            self._by_frame.setdefault(int(self._columns['frame'][row]), []).append(row)
+            self._by_cell.setdefault(int(self._columns['cell_id'][row]), []).append(row)
+        self._size += size
+
+    def rows_for_frame(self, frame):
+        return np.array(self._by_frame.get(frame, []), dtype=np.intp)
+
+    def rows_for_cell(self, cell_id):
+        return np.array(self._by_cell.get(cell_id, []), dtype=np.intp)
+
+    def frames(self):
+        return sorted(self._by_frame)
+
+    def cell_ids(self):
+        return sorted(self._by_cell)
+
+    def row(self, index):
+        # all values of a single row as a dictionary
+        if not -self._size <= index < self._size:
+            raise IndexError("Row index out of range.")
+        return {name: column[index % self._size] for name, column in self._columns.items()}
+
+    def clear(self):
+        self._size = 0
+        self._by_frame.clear()
+        self._by_cell.clear()
+
+    def __str__(self):
+        return f"ResultTable with {self._size} rows, {len(self._by_cell)} cells in {len(self._by_frame)} frames"
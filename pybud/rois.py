@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import roifile
+
+def ellipse_polygons(x_center, y_center, major, minor, angle, n_points=100):
+    """
+    Polygon vertices of many ellipses at once, the same points as Ellipse.generate_ellipse_points.
+
+    Parameters:
+    x_center, y_center, major, minor (1D arrays): the ellipses in pixels, major and minor are semi-axes
+    angle (1D array): the angle of the major axis in degrees, as in ResultTable
+    n_points (int): vertices per ellipse
+
+    Returns:
+    float array of shape (n, n_points, 2) with the x and y coordinates
+    """
+    theta = np.linspace(0, 2 * np.pi, n_points)
+    angle = np.radians(np.asarray(angle, dtype=np.float64))[:, np.newaxis]
+
+    x = np.asarray(major, dtype=np.float64)[:, np.newaxis] * np.cos(theta)
+    y = np.asarray(minor, dtype=np.float64)[:, np.newaxis] * np.sin(theta)
+    cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+
+    polygons = np.empty(x.shape + (2,))
+    polygons[..., 0] = np.asarray(x_center, dtype=np.float64)[:, np.newaxis] + x * cos_angle - y * sin_angle
+    polygons[..., 1] = np.asarray(y_center, dtype=np.float64)[:, np.newaxis] + x * sin_angle + y * cos_angle
+    return polygons
+
+def write_ellipse_rois(results, path, fitting_method, n_points=100):
+    """
+    Write the fitted ellipses of a ResultTable as polygon ROIs to an ImageJ ROI zip, named like
+    <row>_cell<cell_id>_<fitting_method>. The vertices of all ellipses are computed in one call
+    and the zip is written in a single pass. An existing file is replaced.
+
+    Returns:
+    the number of ROIs written
+    """
+    polygons = ellipse_polygons(results['x_center'], results['y_center'], results['major_axis'], results['minor_axis'], results['angle'], n_points)
+
+    rois = []
+    for i, (polygon, frame, cell_id) in enumerate(zip(polygons, results['frame'].tolist(), results['cell_id'].tolist())):
+        roi = roifile.ImagejRoi.frompoints(polygon, name=f"{i}_cell{cell_id}_{fitting_method}", t=frame)
+        roi.roitype = roifile.ROI_TYPE.POLYGON
+        rois.append(roi)
+
+    if os.path.exists(path):
+        os.remove(path)
+    if rois:
+        roifile.roiwrite(path, rois, mode='w')
+    return len(rois)
+
+def read_point_rois(path):
+    """
+    Read the points of an ImageJ ROI zip (or .roi file) with point selections.
+
+    Returns:
+    frames (int array of shape (n,)): the frame of every point, starting at 0
+    coordinates (float array of shape (n, 2)): the x and y coordinates
+    """
+    rois = roifile.roiread(path)
+    if not isinstance(rois, list):
+        rois = [rois]
+
+    frames, coordinates = [], []
+    for roi in rois:
+        # hyperstacks store the frame in t_position, plain stacks in position, both count from 1
+        points = roi.coordinates().reshape(-1, 2)
+        frames.append(np.full(len(points), (roi.t_position or roi.position or 1) - 1))
+        coordinates.append(points)
+
+    if not rois:
+        return np.zeros(0, dtype=np.intp), np.zeros((0, 2))
+    return np.concatenate(frames).astype(np.intp), np.concatenate(coordinates).astype(np.float64)
+
+def read_seed_points(path):
+    """
+    Read seed points from an ImageJ ROI zip (or .roi file) with point selections.
+
+    Returns:
+    list of (frame, x, y) tuples, frames start at 0
+    """
+    frames, coordinates = read_point_rois(path)
+    return [(frame, x, y) for frame, (x, y) in zip(frames.tolist(), coordinates.tolist())]
@@ -0,0 +1,60 @@
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+def detect_seeds(plane, cell_radius, min_distance=None, threshold=3.0, sigma=1.5):
+    """
+    Propose cell centers in a brightfield image.
+
+    Cells are the regions enclosed by strong edges. The edge strength is the gradient magnitude of
+    the smoothed image, pixels more than threshold robust standard deviations above the median
+    are edges. Every enclosed region that fits within the maximum cell radius gives one seed,
+    at the point farthest away from its edge.
+
+    Parameters:
+    plane (2D array): brightfield image of a single frame and channel
+    cell_radius (int): maximum cell radius in pixels
+    min_distance (float): minimum distance between two seeds in pixels, cell_radius / 4 by default
+    threshold (float): edge threshold in robust standard deviations above the median
+    sigma (float): standard deviation of the Gaussian smoothing in pixels
+
+    Returns:
+    float array of shape (n, 2) with the x and y coordinates of the seeds
+    """
+    if min_distance is None:
+        min_distance = max(cell_radius / 4, 1)
+
+    # edges are outliers of the gradient magnitude, the median absolute deviation estimates the noise
+    edges = ndimage.gaussian_gradient_magnitude(np.asarray(plane, dtype=np.float64), sigma)
+    median = np.median(edges)
+    mad = 1.4826 * np.median(np.abs(edges - median))
+    edge_mask = ndimage.binary_closing(edges > median + threshold * mad, iterations=2)
+
+    # regions enclosed by edges are cell interiors, the background touches the image border
+    interiors = ndimage.binary_fill_holes(edge_mask) & ~edge_mask
+    labels, n_regions = ndimage.label(interiors)
+    if n_regions == 0:
+        return np.zeros((0, 2))
+
+    index = np.arange(1, n_regions + 1)
+    distance = ndimage.distance_transform_edt(interiors)
+    depth = ndimage.maximum(distance, labels, index)
+    area = ndimage.sum_labels(interiors, labels, index)
+    positions = np.array(ndimage.maximum_position(distance, labels, index), dtype=np.float64).reshape(-1, 2)
+
+    # drop specks and regions larger than a cell
+    keep = (depth >= max(2, cell_radius / 16)) & (area <= np.pi * cell_radius**2)
+    seeds = positions[keep][:, ::-1]
+    depth = depth[keep]
+
+    # of two seeds closer than min_distance, keep the one deepest inside its region
+    if len(seeds) > 1:
+        order = np.argsort(-depth, kind='stable')
+        removed = np.zeros(len(seeds), dtype=bool)
+        neighbours = cKDTree(seeds).query_ball_point(seeds[order], min_distance)
+        for i, close in zip(order, neighbours):
+            if not removed[i]:
+                removed[[j for j in close if j != i]] = True
+        seeds = seeds[~removed]
+
+    return seeds
@@ -0,0 +1,177 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# selections added or removed since the KD-tree of a frame was built are handled without rebuilding
+# it, until there are more than this many of them or more than an eighth of the tree
+MIN_UNINDEXED = 256
+
+# queries of many coordinates rebuild the tree instead of comparing more than this many pairs linearly
+MAX_LINEAR_PAIRS = 2**20
+
+class _FrameIndex:
+    # KD-tree over the selections of a frame that were added before it was built. These always
+    # come first, so the selections added later are the ones after the first size selections.
+    def __init__(self, coordinates):
+        # the coordinates are copied, the arrays of a frame are changed in place
+        self.tree = cKDTree(coordinates, copy_data=True)
+        self.positions = np.arange(len(coordinates))  # tree index: index in the frame, -1 when removed
+        self.size = len(coordinates)
+        self.removed = 0
+
+    def remove(self, indices):
+        # indices is sorted, only the ones before size are in the tree
+        indices = indices[indices < self.size]
+        if len(indices):
+            removed = (self.positions < 0) | np.isin(self.positions, indices)
+            self.positions = np.where(removed, -1, self.positions - np.searchsorted(indices, self.positions))
+            self.size -= len(indices)
+            self.removed += len(indices)
+
+    def is_stale(self, n_selections, n_queries=1):
+        limit = max(MIN_UNINDEXED, self.size // 8)
+        unindexed = n_selections - self.size
+        return unindexed > limit or self.removed > limit or n_queries * unindexed > MAX_LINEAR_PAIRS
+
+class Selections:
+    """
+    Selected coordinates per frame, stored as (n, 2) NumPy arrays of x and y with a KD-tree per frame
+    for radius and nearest neighbour queries.
+
+    Behaves like the dictionary of frame: [(x, y), ...] lists it replaces: frames can be tested
+    with in, iterated with items() and indexed to get their coordinates, in the order they were added.
+    The KD-tree of a frame is built when it is first queried. Selections added later are searched
+    linearly and removed ones are skipped, the tree is only rebuilt once there are many of them,
+    so adding or removing one selection at a time does not rebuild it for every query.
+    """
+    def __init__(self):
+        self._coordinates = {}
+        self._sizes = {}
+        self._trees = {}
+
+    def __contains__(self, frame):
+        return frame in self._coordinates
+
+    def __getitem__(self, frame):
+        # a read-only view on the coordinates of a frame
+        coordinates = self._coordinates[frame][:self._sizes[frame]]
+        coordinates.flags.writeable = False
+        return coordinates
+
+    def __iter__(self):
+        return iter(self._coordinates)
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    def keys(self):
+        return self._coordinates.keys()
+
+    def values(self):
+        return [self[frame] for frame in self._coordinates]
+
+    def items(self):
+        return [(frame, self[frame]) for frame in self._coordinates]
+
+    def get(self, frame, default=None):
+        return self[frame] if frame in self._coordinates else default
+
+    def count(self):
+        # the number of selections in all frames
+        return sum(self._sizes.values())
+
+    def clear(self):
+        self._coordinates.clear()
+        self._sizes.clear()
+        self._trees.clear()
+
+    def add(self, frame, coordinates):
+        """
+        Append coordinates (an (n, 2) array-like of x and y) to a frame.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+        if frame not in self._coordinates:
+            self._coordinates[frame] = np.zeros((max(len(coordinates), 16), 2))
+            self._sizes[frame] = 0
+
+        size = self._sizes[frame]
+        if size + len(coordinates) > len(self._coordinates[frame]):
+            # grow geometrically so that adding one selection at a time stays cheap
+            grown = np.zeros((max(2 * len(self._coordinates[frame]), size + len(coordinates)), 2))
+            grown[:size] = self._coordinates[frame][:size]
+            self._coordinates[frame] = grown
+
+        self._coordinates[frame][size:size + len(coordinates)] = coordinates
+        self._sizes[frame] = size + len(coordinates)
+
+    def remove(self, frame, indices):
+        """
+        Remove the selections with the given indices from a frame, the frame itself is kept.
+        """
+        if frame not in self._coordinates:
+            return
+
+        indices = np.unique(np.atleast_1d(np.asarray(indices, dtype=np.intp)))
+        remaining = np.delete(self[frame], indices, axis=0)
+        self._coordinates[frame][:len(remaining)] = remaining
+        self._sizes[frame] = len(remaining)
+        if frame in self._trees:
+            self._trees[frame].remove(indices)
+
+    def _index(self, frame, n_queries=1, compact=False):
+        # the index of a frame, rebuilt when it is stale or, with compact, when selections were removed
+        index = self._trees.get(frame)
+        if index is None or index.is_stale(self._sizes[frame], n_queries) or (compact and index.removed):
+            index = self._trees[frame] = _FrameIndex(self[frame])
+        return index
+
+    def within(self, frame, x, y, radius):
+        """
+        Indices of the selections of a frame within radius of (x, y), in the order they were added.
+        x and y can also be arrays, then a list with the indices for every coordinate is returned.
+        """
+        points = np.column_stack([np.ravel(x), np.ravel(y)]).astype(np.float64)
+
+        if frame not in self._coordinates or self._sizes[frame] == 0:
+            found = [np.zeros(0, dtype=np.intp) for _ in points]
+        else:
+            index = self._index(frame, len(points))
+            unindexed = self[frame][index.size:]
+            close = _squared_distances(points, unindexed) <= radius * radius
+
+            found = []
+            for indices, near in zip(index.tree.query_ball_point(points, radius), close):
+                positions = index.positions[np.asarray(indices, dtype=np.intp)]
+                found.append(np.concatenate([np.sort(positions[positions >= 0]), index.size + np.flatnonzero(near)]))
+
+        return found if np.ndim(x) > 0 else found[0]
+
+    def nearest(self, frame, x, y):
+        """
+        Index of and distance to the selection of a frame closest to (x, y), arrays for arrays of
+        coordinates. The index is -1 and the distance infinite when the frame has no selections.
+        """
+        points = np.column_stack([np.ravel(x), np.ravel(y)]).astype(np.float64)
+
+        if frame not in self._coordinates or self._sizes[frame] == 0:
+            distance, index = np.full(len(points), np.inf), np.full(len(points), -1, dtype=np.intp)
+        else:
+            frame_index = self._index(frame, len(points), compact=True)
+            distance, index = frame_index.tree.query(points)
+            index = np.where(np.isfinite(distance), index, -1)
+
+            unindexed = self[frame][frame_index.size:]
+            if len(unindexed):
+                distances = np.sqrt(_squared_distances(points, unindexed))
+                closest = np.argmin(distances, axis=1)
+                closer = distances[np.arange(len(points)), closest] < distance
+                index = np.where(closer, frame_index.size + closest, index)
+                distance = np.where(closer, distances[np.arange(len(points)), closest], distance)
+
+        return (index, distance) if np.ndim(x) > 0 else (index[0], distance[0])
+
+def _squared_distances(points, coordinates):
+    # (points x coordinates) squared distances, like the KD-tree compares them with the squared radius
+    dx = points[:, np.newaxis, 0] - coordinates[np.newaxis, :, 0]
+    dy = points[:, np.newaxis, 1] - coordinates[np.newaxis, :, 1]
+    return dx * dx + dy * dy
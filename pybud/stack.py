@@ -0,0 +1,163 @@
+import threading
+import numbers
+import numpy as np
+import tifffile
+from collections import OrderedDict
+
+def as_stack(img):
+    """
+    Normalize an image to the (frames, channels, height, width) layout used by PyBud.
+    NumPy arrays with 2 or 3 dimensions get extra axes as a view, nothing is copied.
+    """
+    if isinstance(img, np.ndarray):
+        if img.ndim == 2:
+            return img[np.newaxis, np.newaxis]
+        if img.ndim == 3:
+            return img[:, np.newaxis]
+    return img
+
+class TiffStack:
+    """
+    Lazily loaded TIFF stack that can be indexed like a (frames, channels, height, width) array.
+
+    Uncompressed files are memory mapped with tifffile.memmap, other files are read page by page
+    with a small cache of recently used pages. Files that do not store every plane as a separate
+    page are loaded into memory. Only the file path is pickled, so worker processes
+    reopen the file instead of receiving its contents.
+    """
+    ndim = 4
+
+    def __init__(self, path, cache_pages=32):
+        self.path = str(path)
+        self.cache_pages = cache_pages
+        self._open()
+
+    def _open(self):
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self._data = None
+        self._tif = None
+
+        try:
+            self._data = as_stack(tifffile.memmap(self.path, mode='r'))
+            self.shape = self._data.shape
+            self.dtype = self._data.dtype
+            return
+        except ValueError:
+            # compressed or otherwise not memory mappable, fall back to reading pages
+            pass
+
+        self._tif = tifffile.TiffFile(self.path)
+        series = self._tif.series[0]
+        self._series_pages = series.pages
+
+        shape = tuple(series.shape)
+        if len(shape) == 2:
+            self.shape = (1, 1) + shape
+        elif len(shape) == 3:
+            # a 3D stack is (frames, height, width)
+            self.shape = (shape[0], 1) + shape[1:]
+        elif len(shape) == 4:
+            self.shape = shape
+        else:
+            raise ValueError(f"Unsupported image shape {shape}, expected (frames, channels, height, width).")
+
+        self.dtype = np.dtype(series.dtype)
+
+        if len(self._series_pages) != self.shape[0] * self.shape[1]:
+            # planes are not stored as separate pages (e.g. as samples of a single page), load it all
+            self._data = as_stack(series.asarray())
+            self._tif.close()
+            self._tif = None
+
+    def is_memory_mapped(self):
+        return self._data is not None
+
+    def read_plane(self, frame, channel):
+        """
+        Read a single 2D image, using the page cache when the file is not memory mapped.
+        """
+        if self._data is not None:
+            return self._data[frame, channel]
+
+        frame, channel = int(frame) % self.shape[0], int(channel) % self.shape[1]
+        key = (frame, channel)
+
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+
+            plane = self._series_pages[frame * self.shape[1] + channel].asarray()
+            plane.flags.writeable = False
+
+            self._pages[key] = plane
+            if len(self._pages) > self.cache_pages:
+                self._pages.popitem(last=False)
+
+        return plane
+
+    def __getitem__(self, key):
+        if self._data is not None:
+            return self._data[key]
+
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            key = key[:i] + (slice(None),) * (4 - len(key) + 1) + key[i+1:]
+        key = key + (slice(None),) * (4 - len(key))
+
+        key_frame, key_channel, rest = key[0], key[1], key[2:]
+
+        # the common case: a single plane
+        if isinstance(key_frame, numbers.Integral) and isinstance(key_channel, numbers.Integral):
+            return self.read_plane(key_frame, key_channel)[rest]
+
+        # otherwise read the planes that are needed into a block and index that instead
+        frames, key_frame = self._block_index(key_frame, self.shape[0])
+        channels, key_channel = self._block_index(key_channel, self.shape[1])
+
+        block = np.empty((len(frames), len(channels)) + self.shape[2:], dtype=self.dtype)
+        for i, frame in enumerate(frames):
+            for j, channel in enumerate(channels):
+                block[i, j] = self.read_plane(frame, channel)
+
+        return block[(key_frame, key_channel) + rest]
+
+    @staticmethod
+    def _block_index(key, size):
+        # the planes to read along one axis and the key to index the block with afterwards
+        if isinstance(key, numbers.Integral):
+            return [key], 0
+        if isinstance(key, slice):
+            return list(range(size)[key]), slice(None)
+
+        indices = np.arange(size)[np.asarray(key)]
+        unique = np.unique(indices)
+        return list(unique), np.searchsorted(unique, indices)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:, :], dtype=dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getstate__(self):
+        return {'path': self.path, 'cache_pages': self.cache_pages}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def close(self):
+        if self._tif is not None:
+            self._tif.close()
+            self._tif = None
+        self._data = None
+
+def open_stack(path, cache_pages=32):
+    """
+    Open a TIFF stack lazily, see TiffStack.
+    """
+    return TiffStack(path, cache_pages)
@@ -0,0 +1,86 @@
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# the stages of a measurement, in the order they run
+STAGES = ['background', 'ray_sampling', 'outlier_filtering', 'ellipse_fit', 'fluorescence']
+
+# rays that remain after each of the edge filters, cast counts all rays
+RAY_COUNTS = ['cast', 'edge_found', 'radius', 'difference', 'slope', 'slope_sign', 'accepted']
+
+# why a track stopped, see Cell.status
+TERMINATIONS = ['too_few_rays', 'out_of_bounds', 'fit_error', 'end_of_stack']
+
+class RunStatistics:
+    """
+    Cumulative timings of the measurement stages, ray counts per edge filter and the reason every
+    track stopped, collected by PyBud.fit_cells when PyBud.instrument is set.
+
+    The callback, if given, is called with the statistics every time a track stops.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timers = dict.fromkeys(STAGES, 0.0)
+        self.rays = dict.fromkeys(RAY_COUNTS, 0)
+        self.cells = 0
+        self.terminations = {}      # cell_id: (frame, reason)
+        self.wall_time = 0.0
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[stage] += time.perf_counter() - start
+
+    def count_rays(self, name, count):
+        self.rays[name] += int(count)
+
+    def add_cell(self, cell):
+        self.cells += 1
+
+    def end_track(self, cell_id, frame, reason):
+        # frame is the first frame in which the cell was not found, or the last frame of the stack
+        self.terminations[cell_id] = (frame, reason)
+        if self.callback is not None:
+            self.callback(self)
+
+    def merge(self, other):
+        # add the statistics of another run, e.g. of tracks fitted in a worker process
+        for stage, seconds in other.timers.items():
+            self.timers[stage] += seconds
+        for name, count in other.rays.items():
+            self.rays[name] += count
+        self.cells += other.cells
+        for cell_id, termination in other.terminations.items():
+            self.end_track(cell_id, *termination)
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self._start
+
+    def termination_counts(self):
+        counts = Counter(reason for _, reason in self.terminations.values())
+        return {reason: counts[reason] for reason in TERMINATIONS}
+
+    def __getstate__(self):
+        # callbacks are usually not picklable and belong to the process that created them
+        state = self.__dict__.copy()
+        state['callback'] = None
+        return state
+
+    def __str__(self):
+        timers = ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in self.timers.items())
+        cast = max(self.rays['cast'], 1)
+        rays = ", ".join(f"{name} {count} ({100 * count / cast:.1f}%)" for name, count in self.rays.items())
+        terminations = ", ".join(f"{reason} {count}" for reason, count in self.termination_counts().items())
+
+        return (f"{self.cells} cells in {len(self.terminations)} tracks, {self.wall_time:.3f} s\n"
+                f"stage times: {timers}\n"
+                f"rays: {rays}\n"
+                f"track terminations: {terminations}")
+
+def stage_timer(statistics, stage):
+    # times a stage when statistics are collected
+    return statistics.timer(stage) if statistics is not None else nullcontext()
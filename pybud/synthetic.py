@@ -0,0 +1,76 @@
+import numpy as np
+
+def synthetic_stack(frames=10, channels=2, height=512, width=512, n_cells=20, radius=(15, 30), drift=(0.5, 0.25), growth=0.005, noise=30, seed=0):
+    """
+    Generate a deterministic image stack of yeast-like cells, e.g. for tests and benchmarks.
+
+    Every cell is an ellipse with a dark rim and a bright halo in the brightfield channel (0) and
+    a filled ellipse with a cell specific intensity in the fluorescent channels. The cells drift
+    across the image, grow slowly and the images contain Gaussian noise.
+
+    Parameters:
+    frames, channels, height, width (int): size of the stack
+    n_cells (int): number of cells, less cells are placed when they do not fit without overlap
+    radius (tuple): minimum and maximum semi-axis length in pixels
+    drift (tuple): x and y displacement of all cells per frame in pixels
+    growth (float): relative growth of the semi-axes per frame
+    noise (float): standard deviation of the noise
+    seed (int): seed of the random number generator
+
+    Returns:
+    img (uint16 array of shape (frames, channels, height, width)): the stack
+    cells (float array of shape (frames, n, 5)): the [x_center, y_center, a, b, angle] of every cell
+    in every frame, with a >= b
+    """
+    rng = np.random.default_rng(seed)
+    min_radius, max_radius = radius
+
+    # place cells without overlap, keeping a margin for the drift and the halo
+    margin = max_radius * 1.5 + np.hypot(*drift) * frames
+    centers = []
+    for _ in range(50 * n_cells):
+        if len(centers) == n_cells:
+            break
+        center = rng.uniform([margin, margin], [width - margin, height - margin])
+        if all(np.hypot(*(center - other)) > 2.5 * max_radius for other in centers):
+            centers.append(center)
+    centers = np.array(centers).reshape(-1, 2)
+
+    a = rng.uniform(min_radius, max_radius, len(centers))
+    b = a * rng.uniform(0.6, 0.95, len(centers))
+    angle = rng.uniform(0, np.pi, len(centers))
+    intensity = rng.uniform(300, 1500, (len(centers), max(channels - 1, 0)))
+
+    cells = np.zeros((frames, len(centers), 5))
+    for frame in range(frames):
+        scale = (1 + growth) ** frame
+        cells[frame, :, 0] = centers[:, 0] + drift[0] * frame
+        cells[frame, :, 1] = centers[:, 1] + drift[1] * frame
+        cells[frame, :, 2] = a * scale
+        cells[frame, :, 3] = b * scale
+        cells[frame, :, 4] = angle
+
+    img = np.empty((frames, channels, height, width), dtype=np.uint16)
+    for frame in range(frames):
+        planes = np.empty((channels, height, width))
+        planes[0] = 1000
+        planes[1:] = 100
+
+        for i, (x_center, y_center, semi_a, semi_b, phi) in enumerate(cells[frame]):
+            # only the bounding box of the halo is rendered
+            extent = int(np.ceil(semi_a * 1.25)) + 1
+            x0, x1 = max(int(x_center) - extent, 0), min(int(x_center) + extent + 1, width)
+            y0, y1 = max(int(y_center) - extent, 0), min(int(y_center) + extent + 1, height)
+            y, x = np.ogrid[y0:y1, x0:x1]
+
+            x_rot = (x - x_center) * np.cos(phi) + (y - y_center) * np.sin(phi)
+            y_rot = -(x - x_center) * np.sin(phi) + (y - y_center) * np.cos(phi)
+            r = np.sqrt((x_rot / semi_a) ** 2 + (y_rot / semi_b) ** 2)
+
+            planes[0, y0:y1, x0:x1] += -600 * (np.abs(r - 1) < 0.08) + 500 * (np.abs(r - 1.12) < 0.06)
+            planes[1:, y0:y1, x0:x1] += intensity[i, :, np.newaxis, np.newaxis] * (r < 1)
+
+        planes += rng.normal(0, noise, planes.shape)
+        img[frame] = np.clip(planes, 0, 65535)
+
+    return img, cells
@@ -0,0 +1,57 @@
+import pybud
+import numpy as np
+import pytest
+from tests.test_edge import make_stack
+
+def create_pybud():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 4, axis=0)
+    pb.edge_rel_min = 8
+    pb.checkpoint_interval = 0
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(1, 121, 109)
+    return pb
+
+@pytest.mark.parametrize("order", ["track", "frame"])
+def test_checkpoint_resume(tmp_path, order):
+    path = str(tmp_path / "checkpoint.npz")
+
+    reference = create_pybud()
+    reference.fit_cells(order)
+
+    # interrupt the run while fitting the fifth cell
+    interrupted = create_pybud()
+    create_cell = interrupted.create_cell
+    def failing_create_cell(*args, **kwargs):
+        if failing_create_cell.calls == 4:
+            raise KeyboardInterrupt
+        failing_create_cell.calls += 1
+        return create_cell(*args, **kwargs)
+    failing_create_cell.calls = 0
+    interrupted.create_cell = failing_create_cell
+
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.fit_cells(order, checkpoint=path)
+
+    with np.load(path) as data:
+        saved = len(data['results_cell_id'])
+    assert 0 < saved <= 4
+
+    # the resumed run only fits the frames that were not saved yet
+    resumed = create_pybud()
+    resumed.fit_cells(order, checkpoint=path)
+    assert len(resumed.cells) == len(reference.results) - saved
+
+    key = lambda results: np.lexsort((results['frame'], results['cell_id']))
+    for name in ['cell_id', 'frame', 'x_center', 'major', 'fl_mean']:
+        assert np.allclose(resumed.results[name][key(resumed.results)], reference.results[name][key(reference.results)])
+
+    # a finished checkpoint restores all results without fitting
+    finished = create_pybud()
+    finished.fit_cells(order, checkpoint=path)
+    assert finished.cells == [] and len(finished.results) == len(reference.results)
+
+    changed = create_pybud()
+    changed.edge_rel_min = 10
+    with pytest.raises(ValueError):
+        changed.fit_cells(order, checkpoint=path)
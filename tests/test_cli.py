@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import roifile
+import tifffile
+from pybud import cli
+from tests.test_edge import make_stack
+
+def test_cli(tmp_path, capsys):
+    stack_path = str(tmp_path / "stack.tif")
+    tifffile.imwrite(stack_path, np.repeat(make_stack(), 3, axis=0), imagej=True, metadata={'axes': 'TCYX'})
+
+    rois = []
+    for frame, x, y in [(0, 120, 110), (1, 3, 4)]:
+        roi = roifile.ImagejRoi.frompoints([[x, y]])
+        roi.roitype = roifile.ROI_TYPE.POINT
+        roi.t_position = frame + 1
+        rois.append(roi)
+    roifile.roiwrite(str(tmp_path / "stack.zip"), rois)
+
+    assert cli.read_seed_points(str(tmp_path / "stack.zip")) == [(0, 120.0, 110.0), (1, 3.0, 4.0)]
+
+    config_path = tmp_path / "settings.toml"
+    config_path.write_text("edge_rel_min = 8\nfl_channels = [1]\n")
+
+    assert cli.main([stack_path, "--config", str(config_path), "--output-dir", str(tmp_path / "out")]) == 0
+
+    with open(tmp_path / "out" / "stack_results.csv") as file:
+        lines = file.read().splitlines()
+    assert lines[0].startswith("cell_id,frame,")
+    assert "fl_mean_ch1" in lines[0].split(",")
+    assert len(lines) == 1 + 3
+
+    rois = roifile.roiread(str(tmp_path / "out" / "stack_rois.zip"))
+    assert [roi.t_position for roi in rois] == [1, 2, 3]
+
+    # the run statistics are printed on request
+    capsys.readouterr()
+    assert cli.main([stack_path, "--config", str(config_path), "--output-dir", str(tmp_path / "out"), "--stats"]) == 0
+    output = capsys.readouterr().out
+    assert "3 cells in 2 tracks" in output
+    assert "too_few_rays 1" in output
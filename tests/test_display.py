@@ -0,0 +1,117 @@
+import numpy as np
+import time
+from pybud.display import DisplayCache, DisplayPrefetcher, auto_contrast, display_lut, to_display
+
+def make_stack():
+    # dim 12 bit stack with a bright square
+    rng = np.random.default_rng(0)
+    img = rng.integers(100, 200, (6, 2, 64, 80)).astype(np.uint16)
+    img[:, :, 20:30, 20:30] = 4000
+    return img
+
+def test_auto_contrast():
+    img = make_stack()
+    low, high = auto_contrast(img, 0)
+    assert 100 <= low < 110
+    assert high == 4000
+
+    values = img[:, 0].ravel()
+    assert np.isclose(low, np.percentile(values, 0.5, method='lower'))
+
+    # the same result without the histogram
+    assert np.allclose(auto_contrast(img.astype(np.float32), 0), (low, high), atol=1)
+
+    # a constant channel still has a valid range
+    assert auto_contrast(np.zeros((2, 1, 8, 8), dtype=np.uint16), 0) == (0.0, 1.0)
+
+def test_display_lut():
+    lut = display_lut(100, 4000)
+    assert lut.shape == (65536,)
+    assert lut[0] == lut[100] == 0
+    assert lut[4000] == lut[65535] == 255
+
+    plane = make_stack()[0, 0]
+    assert np.array_equal(to_display(plane, 100, 4000, lut), to_display(plane, 100, 4000))
+    assert display_lut(0, 255, dtype=np.uint8).shape == (256,)
+
+def test_display_cache():
+    img = make_stack()
+    cache = DisplayCache(img, max_bytes=3 * 64 * 80)
+
+    first = cache.get(0, 0)
+    assert first.dtype == np.uint8 and first.shape == (64, 80)
+    assert first[25, 25] == 255 and not first.flags.writeable
+    assert cache.get(0, 0) is first
+    assert (0, 0) in cache and (0, 1) not in cache
+
+    # least recently used frames are evicted beyond max_bytes
+    for frame in range(1, 4):
+        cache.get(frame, 0)
+    assert len(cache) == 3
+    assert (0, 0) not in cache
+
+    # a new contrast converts the frame again
+    cache.set_contrast(0, 0, 8000)
+    assert (3, 0) not in cache
+    assert cache.get(3, 0)[25, 25] == 128
+    cache.set_contrast(0)
+    assert cache.get_contrast(0) == auto_contrast(img, 0)
+
+class SlowStack:
+    # a stack that takes a while to read every plane and records which planes were read
+    def __init__(self, img, delay):
+        self.img = img
+        self.shape = img.shape
+        self.dtype = img.dtype
+        self.delay = delay
+        self.read = []
+
+    def __getitem__(self, key):
+        if len(key) == 2:
+            time.sleep(self.delay)
+            self.read.append(key[0])
+        return self.img[key]
+
+def test_prefetch():
+    img = np.repeat(make_stack(), 10, axis=0)
+    cache = DisplayCache(img)
+    prefetcher = DisplayPrefetcher(cache, ahead=3, behind=2)
+
+    assert prefetcher.neighbours(10, 1) == [11, 9, 12, 8, 13]
+    assert prefetcher.neighbours(10, -1) == [9, 11, 8, 12, 7]
+    assert prefetcher.neighbours(0, 1) == [1, 2, 3]
+
+    prefetcher.request(10, 0)
+    assert prefetcher.wait(10)
+    assert all((frame, 0) in cache for frame in [8, 9, 11, 12, 13])
+    assert (10, 0) not in cache and (14, 0) not in cache
+
+    # moving backwards prefetches the frames before the current one first
+    prefetcher.request(5, 0)
+    assert prefetcher.wait(10)
+    assert all((frame, 0) in cache for frame in [2, 3, 4, 6, 7])
+    prefetcher.stop()
+
+def test_prefetch_cancels_stale_requests():
+    stack = SlowStack(np.repeat(make_stack(), 10, axis=0), delay=0.05)
+    cache = DisplayCache(stack)
+    cache.get_contrast(0)
+    stack.read.clear()
+    prefetcher = DisplayPrefetcher(cache, ahead=8, behind=0)
+
+    # jump to another position while the first request is being prefetched
+    prefetcher.request(0, 0)
+    time.sleep(0.07)
+    prefetcher.request(40, 0)
+    assert prefetcher.wait(10)
+    prefetcher.stop()
+
+    assert stack.read[-8:] == list(range(41, 49))
+    assert len(stack.read) < 8 + 8
+
+if __name__ == "__main__":
+    test_auto_contrast()
+    test_display_lut()
+    test_display_cache()
+    test_prefetch()
+    test_prefetch_cancels_stale_requests()
@@ -0,0 +1,85 @@
+import pybud
+import numpy as np
+
+def make_stack(height=240, width=260):
+    # brightfield image with a dark/bright elliptical rim, fluorescent channel filled inside the cell
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[:height, :width]
+    x_rot = (x - 120) * np.cos(0.4) + (y - 110) * np.sin(0.4)
+    y_rot = -(x - 120) * np.sin(0.4) + (y - 110) * np.cos(0.4)
+    r = np.sqrt((x_rot / 30) ** 2 + (y_rot / 22) ** 2)
+
+    img = np.zeros((1, 2, height, width), dtype=np.uint16)
+    img[0, 0] = 1000 - 600 * (np.abs(r - 1) < 0.08) + 500 * (np.abs(r - 1.12) < 0.06) + rng.normal(0, 30, (height, width))
+    img[0, 1] = 100 + 800 * (r < 1) + rng.normal(0, 20, (height, width))
+    return img
+
+def test_vectorized_engine_matches_reference():
+    img = make_stack()
+    rng = np.random.default_rng(1)
+    seeds = [(120, 110), (118.6, 111.4), (3, 4), (250, 230)] + [tuple(rng.random(2) * 240) for _ in range(5)]
+
+    for x, y in seeds:
+        reference = pybud.Cell(img, 0.0645, 0, [1], 0, x, y, 1, 62, 16, 8, edge_engine='reference')
+        vectorized = pybud.Cell(img, 0.0645, 0, [1], 0, x, y, 1, 62, 16, 8, edge_engine='vectorized')
+
+        for name in ['pixel_found', 'found_x', 'found_y', 'found_rad', 'found_dif', 'found_edge', 'found_slope']:
+            assert np.array_equal(getattr(reference, name), getattr(vectorized, name)), name
+
+        assert reference.cell_found == vectorized.cell_found
+        assert reference.mean_edge == vectorized.mean_edge
+
+    assert pybud.Cell(img, 0.0645, 0, [1], 0, 120, 110, 1, 62, 16, 8).cell_found
+
+def test_batched_edges_match_single_cell():
+    img = make_stack()
+    rng = np.random.default_rng(2)
+    x = np.concatenate([[120, 118.6, 3], rng.random(20) * 260])
+    y = np.concatenate([[110, 111.4, 4], rng.random(20) * 240])
+
+    edges = pybud.edge.find_cell_edges(img[0, 0], x, y, 62, 16, 8)
+    assert len(edges) == len(x)
+
+    for edge in edges:
+        cell = pybud.Cell(img, 0.0645, 0, [1], 0, edge.x_selected, edge.y_selected, 1, 62, 16, 8)
+        assert np.array_equal(cell.pixel_found, edge.pixel_found)
+        assert cell.cell_found == edge.cell_found
+        assert np.isclose(cell.mean_edge, edge.mean_edge)
+
+    pb = pybud.PyBud()
+    pb.img = img
+    pb.edge_rel_min = 8
+    cells = pb.fit_frame(0, [(120, 110), (3, 4)], cell_ids=[1, 2])
+    assert [cell.cell_found for cell in cells] == [True, False]
+    assert cells[0].id == 1 and cells[0].ellipse is not None
+
+def test_incremental_tracking():
+    img = make_stack()
+    full = pybud.edge.find_cell_edges(img[0, 0], [120], [110], 62, 16, 8)[0]
+    previous = pybud.Ellipse(full.found_x[full.pixel_found], full.found_y[full.pixel_found], method='algebraic').params
+
+    # a band around the previous ellipse finds the same edge, seeds outside their ellipse fall back to the full search
+    edges = pybud.edge.find_cell_edges(img[0, 0], [120, 120], [110, 110], 62, 16, 8, previous=[previous, [200, 200, 10, 10, 0]], band=4)
+    assert [edge.search for edge in edges] == ['annulus', 'full']
+    assert edges[0].cell_found and edges[1].cell_found
+    assert np.array_equal(edges[1].pixel_found, full.pixel_found)
+    assert np.sum(edges[0].pixel_found & full.pixel_found) >= 150
+    assert np.allclose(edges[0].found_x[edges[0].pixel_found & full.pixel_found], full.found_x[edges[0].pixel_found & full.pixel_found], atol=1)
+
+    # tracking with and without the narrow search gives the same cells
+    results = []
+    for incremental in [False, True]:
+        pb = pybud.PyBud()
+        pb.img = np.repeat(img, 3, axis=0)
+        pb.edge_rel_min = 8
+        pb.incremental_tracking = incremental
+        pb.add_selection(0, 120, 110)
+        pb.fit_cells()
+        results.append(np.array([cell.ellipse.params for cell in pb.cells]))
+    assert results[0].shape == (3, 5)
+    assert np.allclose(results[0], results[1])
+
+if __name__ == "__main__":
+    test_vectorized_engine_matches_reference()
+    test_batched_edges_match_single_cell()
+    test_incremental_tracking()
@@ -1,49 +1,96 @@
-import pybud
-import numpy as np
-import roifile
-import tifffile
-
-def test_ellipse():
-
-    roi_ellipse = roifile.roiread("tests/ellipse.roi")
-    indices = range(0, roi_ellipse.n_coordinates, roi_ellipse.n_coordinates // 32)
-    x = roi_ellipse.integer_coordinates[indices,0] + roi_ellipse.left + np.random.normal(0, 2, len(indices))
-    y = roi_ellipse.integer_coordinates[indices,1] + roi_ellipse.top + np.random.normal(0, 2, len(indices))
-
-    roi_points = roifile.ImagejRoi.frompoints(np.column_stack((x, y)))
-    roi_points.roitype = roifile.ROI_TYPE.POINT
-    roi_points.name = "points_with_noise"
-    
-    rois = [roi_ellipse, roi_points]
-
-    for method in ['geometric', 'algebraic']:
-
-        # Create Ellipse object
-        ellipse = pybud.Ellipse(x, y, method=method)
-
-        # Access ellipse parameters
-        print("Center (X, Y):", ellipse.get_x_center(), ellipse.get_y_center())
-        print("Semi-major axis:", ellipse.get_major())
-        print("Semi-minor axis:", ellipse.get_minor())
-        print("Rotation angle (degrees):", ellipse.get_angle())
-
-        x_points, y_points = ellipse.generate_ellipse_points(100)
-
-        roi_fitted = roifile.ImagejRoi.frompoints(np.column_stack((x_points, y_points)))
-        roi_fitted.roitype = roifile.ROI_TYPE.POLYGON
-        roi_fitted.name = f"ellipse_fitted_{method}"
-        rois.append(roi_fitted)
-
-        mask = ellipse.get_mask(100, 100)
-
-        # Convert the boolean mask to an 8-bit unsigned integer (0 for False, 255 for True)
-        mask_uint8 = (mask * 255).astype(np.uint8)
-        # Save the mask as a TIFF file
-        tifffile.imwrite(f"tests/mask-{method}.tif", mask_uint8)
-
-
-    roifile.roiwrite("tests/ellipse_fitted.zip", rois, mode='w')
-
-
-if __name__ == "__main__":
-    test_ellipse()
\ No newline at end of file
+import pybud
+import numpy as np
+import roifile
+import tifffile
+
+def test_ellipse():
+
+    roi_ellipse = roifile.roiread("tests/ellipse.roi")
+    indices = range(0, roi_ellipse.n_coordinates, roi_ellipse.n_coordinates // 32)
+    x = roi_ellipse.integer_coordinates[indices,0] + roi_ellipse.left + np.random.normal(0, 2, len(indices))
+    y = roi_ellipse.integer_coordinates[indices,1] + roi_ellipse.top + np.random.normal(0, 2, len(indices))
+
+    roi_points = roifile.ImagejRoi.frompoints(np.column_stack((x, y)))
+    roi_points.roitype = roifile.ROI_TYPE.POINT
+    roi_points.name = "points_with_noise"
+    
+    rois = [roi_ellipse, roi_points]
+
+    for method in ['geometric', 'algebraic']:
+
+        # Create Ellipse object
+        ellipse = pybud.Ellipse(x, y, method=method)
+
+        # Access ellipse parameters
+        print("Center (X, Y):", ellipse.get_x_center(), ellipse.get_y_center())
+        print("Semi-major axis:", ellipse.get_major())
+        print("Semi-minor axis:", ellipse.get_minor())
+        print("Rotation angle (degrees):", ellipse.get_angle())
+
+        x_points, y_points = ellipse.generate_ellipse_points(100)
+
+        roi_fitted = roifile.ImagejRoi.frompoints(np.column_stack((x_points, y_points)))
+        roi_fitted.roitype = roifile.ROI_TYPE.POLYGON
+        roi_fitted.name = f"ellipse_fitted_{method}"
+        rois.append(roi_fitted)
+
+        mask = ellipse.get_mask(100, 100)
+
+        # Convert the boolean mask to an 8-bit unsigned integer (0 for False, 255 for True)
+        mask_uint8 = (mask * 255).astype(np.uint8)
+        # Save the mask as a TIFF file
+        tifffile.imwrite(f"tests/mask-{method}.tif", mask_uint8)
+
+
+    roifile.roiwrite("tests/ellipse_fitted.zip", rois, mode='w')
+
+
+def test_fit_algebraic_ellipses():
+    rng = np.random.default_rng(0)
+    x, y = [], []
+
+    for i in range(50):
+        n = rng.integers(20, 200)
+        theta = rng.random(n) * 2 * np.pi
+        a, b, phi = rng.random() * 30 + 10, rng.random() * 20 + 5, rng.random() * np.pi
+        x.append(100 + a * np.cos(theta) * np.cos(phi) - b * np.sin(theta) * np.sin(phi) + rng.normal(0, 1, n))
+        y.append(90 + a * np.cos(theta) * np.sin(phi) + b * np.sin(theta) * np.cos(phi) + rng.normal(0, 1, n))
+
+    params = pybud.ellipse.fit_algebraic_ellipses(x, y)
+    assert params.shape == (50, 5)
+
+    for p, xi, yi in zip(params, x, y):
+        assert np.allclose(p, pybud.Ellipse(xi, yi, method='algebraic').params, rtol=1e-6, atol=1e-6)
+
+    # collinear points have no ellipse
+    assert np.all(np.isnan(pybud.ellipse.fit_algebraic_ellipses([np.arange(5.0)], [np.arange(5.0)])))
+
+def test_geometric_jacobian_and_warm_start():
+    rng = np.random.default_rng(1)
+    theta = rng.random(200) * 2 * np.pi
+    x = 100 + 30 * np.cos(theta) * np.cos(0.4) - 20 * np.sin(theta) * np.sin(0.4) + rng.normal(0, 0.5, 200)
+    y = 80 + 30 * np.cos(theta) * np.sin(0.4) + 20 * np.sin(theta) * np.cos(0.4) + rng.normal(0, 0.5, 200)
+
+    ellipse = pybud.Ellipse(x, y, method='geometric')
+
+    # the analytic jacobian matches central differences
+    params = np.array([101, 79, 28, 22, 0.3])
+    numeric = np.empty((len(x), 5))
+    for i in range(5):
+        step = np.zeros(5)
+        step[i] = 1e-6
+        numeric[:, i] = (ellipse.ellipse_equation(params + step, x, y) - ellipse.ellipse_equation(params - step, x, y)) / 2e-6
+    assert np.allclose(ellipse.ellipse_jacobian(params, x, y), numeric, atol=1e-6)
+
+    # starting from the algebraic solution or a nearby (swapped, rotated by pi) ellipse gives the same fit
+    guesses = ['algebraic', [101, 79, 21, 31, 0.4 + np.pi / 2 + np.pi]]
+    for guess in guesses:
+        warm = pybud.Ellipse(x, y, method='geometric', initial_guess=guess)
+        assert np.allclose([warm.get_x_center(), warm.get_y_center(), warm.get_major(), warm.get_minor()],
+                           [ellipse.get_x_center(), ellipse.get_y_center(), ellipse.get_major(), ellipse.get_minor()], atol=1e-5)
+        assert np.isclose(np.radians(warm.get_angle()) % np.pi, np.radians(ellipse.get_angle()) % np.pi, atol=1e-6)
+
+if __name__ == "__main__":
+    test_ellipse()
+    test_fit_algebraic_ellipses()
+    test_geometric_jacobian_and_warm_start()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import csv
+import numpy as np
+import pytest
+import pybud
+from pybud.export import ResultWriter, available_formats, get_result_columns, write_results
+from tests.test_edge import make_stack
+
+def fit_cells():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(1, 121, 109)
+    pb.fit_cells()
+    return pb
+
+def read_csv(path):
+    with open(path, newline='') as file:
+        rows = list(csv.reader(file))
+    return rows[0], rows[1:]
+
+def test_csv_export(tmp_path):
+    pb = fit_cells()
+    path = str(tmp_path / "results.csv")
+    assert write_results(pb.results, path, chunk_size=2) == 5
+
+    header, rows = read_csv(path)
+    columns = get_result_columns(pb.results)
+    assert header == list(columns)
+    for name in ['fl_mean_ch1', 'fl_sd_ch1', 'fl_median_ch1', 'edge_width', 'major_axis', 'major']:
+        assert name in header
+
+    # full precision, in the order of the results
+    values = np.array(rows, dtype=np.float64)
+    for i, column in enumerate(columns.values()):
+        assert np.array_equal(values[:, i], column)
+
+def test_streaming_export(tmp_path):
+    pb = fit_cells()
+
+    # cells are written in chunks while they are fitted, without a result table
+    path = str(tmp_path / "streamed.csv")
+    with ResultWriter(path, pb.fl_channels, pb.pixel_size, chunk_size=2) as writer:
+        for cell in pb.iter_fit_cells():
+            writer.append_cell(cell)
+    assert writer.rows == 5
+
+    write_results(pb.results, str(tmp_path / "results.csv"))
+    assert read_csv(path) == read_csv(str(tmp_path / "results.csv"))
+
+    # an empty export has a header only
+    empty = str(tmp_path / "empty.csv")
+    write_results(pybud.PyBud().results, empty)
+    header, rows = read_csv(empty)
+    assert header[:2] == ['cell_id', 'frame'] and rows == []
+
+def test_export_formats(tmp_path):
+    with pytest.raises(ValueError):
+        write_results(pybud.PyBud().results, str(tmp_path / "results.xlsx"))
+    if 'hdf5' not in available_formats():
+        with pytest.raises(ImportError):
+            write_results(pybud.PyBud().results, str(tmp_path / "results.h5"))
+
+def test_parquet_export(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    pb = fit_cells()
+    path = str(tmp_path / "results.parquet")
+    write_results(pb.results, path, chunk_size=2)
+
+    table = parquet.read_table(path)
+    for name, column in get_result_columns(pb.results).items():
+        assert np.array_equal(table[name].to_numpy(), column)
+
+def test_hdf5_export(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    pb = fit_cells()
+    path = str(tmp_path / "results.h5")
+    write_results(pb.results, path, chunk_size=2)
+
+    with h5py.File(path, 'r') as file:
+        for name, column in get_result_columns(pb.results).items():
+            assert np.array_equal(file['results'][name][:], column)
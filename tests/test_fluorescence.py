@@ -0,0 +1,45 @@
+import pybud
+import numpy as np
+
+def test_measure_channels_matches_single_channel():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 4096, (2, 3, 120, 140)).astype(np.uint16)
+
+    theta = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+    x = 70 + 30 * np.cos(theta) * np.cos(0.5) - 18 * np.sin(theta) * np.sin(0.5)
+    y = 60 + 30 * np.cos(theta) * np.sin(0.5) + 18 * np.sin(theta) * np.cos(0.5)
+    ellipse = pybud.Ellipse(x + rng.normal(0, 1, 40), y + rng.normal(0, 1, 40), method='algebraic')
+
+    rows, cols = ellipse.get_mask_indices(120, 140)
+    mask = ellipse.get_mask(120, 140)
+    assert np.array_equal(img[1, 2][mask], img[1, 2][rows, cols])
+
+    measurements = pybud.Fluorescence.measure_channels(img, 1, [2, 0], ellipse)
+
+    for fluorescence, channel in zip(measurements, [2, 0]):
+        pixels = img[1, channel][mask]
+        assert fluorescence.mean == np.mean(pixels)
+        assert fluorescence.sd == np.std(pixels)
+        assert fluorescence.median == np.median(pixels)
+        assert fluorescence.integrated == np.sum(pixels)
+        assert fluorescence.percentiles[95] == np.percentile(pixels, 95)
+
+        single = pybud.Fluorescence(img[1, channel], ellipse)
+        assert single.mean == fluorescence.mean and single.median == fluorescence.median
+
+def test_failed_fit_has_nan_statistics():
+    img = np.ones((1, 2, 50, 60), dtype=np.uint16)
+    ellipse = pybud.Ellipse.from_params(np.zeros(5), np.zeros(5), np.full(5, np.nan))
+    assert ellipse.get_bounding_box(50, 60) == (0, 0, 0, 0)
+
+    rows, cols = ellipse.get_mask_indices(50, 60)
+    assert len(rows) == len(cols) == ellipse.get_mask(50, 60).sum() == 0
+
+    for fluorescence in pybud.Fluorescence.measure_channels(img, 0, [1, 0], ellipse):
+        assert fluorescence.n_pixels == 0 and fluorescence.integrated == 0
+        assert np.isnan(fluorescence.mean) and np.isnan(fluorescence.median)
+        assert all(np.isnan(value) for value in fluorescence.percentiles.values())
+
+if __name__ == "__main__":
+    test_measure_channels_matches_single_channel()
+    test_failed_fit_has_nan_statistics()
@@ -0,0 +1,34 @@
+import pybud
+import numpy as np
+from pybud.framestats import fast_median, FrameStatistics
+
+def test_fast_median():
+    rng = np.random.default_rng(0)
+
+    for dtype in [np.uint8, np.uint16, np.int16, np.float32]:
+        for size in [1, 2, 999, 1000]:
+            info = np.iinfo(dtype) if np.issubdtype(dtype, np.integer) else np.finfo(dtype)
+            values = rng.integers(max(info.min, -30000), min(info.max, 30000), size).astype(dtype)
+            assert fast_median(values) == np.median(values)
+
+def test_background_cache():
+    img = np.random.default_rng(1).integers(0, 4096, (3, 2, 300, 300)).astype(np.uint16)
+    stats = FrameStatistics(max_size=2)
+
+    for frame in range(3):
+        assert stats.get_background(img, frame, 0) == np.median(img[frame, 0, 50:200, 50:200])
+    assert len(stats) == 2
+
+    pb = pybud.PyBud()
+    pb.img = img
+    pb.get_background(0)
+    assert len(pb.frame_stats) == 1
+    pb.bf_channel = 1
+    assert len(pb.frame_stats) == 0
+    pb.get_background(0)
+    pb.img = img
+    assert len(pb.frame_stats) == 0
+
+if __name__ == "__main__":
+    test_fast_median()
+    test_background_cache()
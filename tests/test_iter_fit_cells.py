@@ -0,0 +1,47 @@
+import pybud
+import numpy as np
+from tests.test_edge import make_stack
+
+def test_iter_fit_cells():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.add_selection(1, 120, 110)
+    pb.add_selection(0, 121, 109)
+    pb.add_selection(0, 3, 4)
+
+    stream = pb.iter_fit_cells()
+    first = next(stream)
+    assert (first.id, first.frame) == (1, 1)
+    assert pb.cells == []
+
+    track_order = [first] + list(stream)
+    frame_order = list(pb.iter_fit_cells(order='frame'))
+
+    assert [(cell.id, cell.frame) for cell in track_order] == [(1, 1), (1, 2), (2, 0), (2, 1), (2, 2)]
+    assert [(cell.id, cell.frame) for cell in frame_order] == [(2, 0), (1, 1), (2, 1), (1, 2), (2, 2)]
+
+    by_key = {(cell.id, cell.frame): cell for cell in track_order}
+    for cell in frame_order:
+        assert np.isclose(cell.x_centroid, by_key[(cell.id, cell.frame)].x_centroid)
+
+    pb.fit_cells(order='frame')
+    assert len(pb.cells) == 5
+
+def test_geometric_angles_are_cold_fits():
+    # without warm starts, every geometric fit reports the angle of an independent fit
+    pb = pybud.PyBud(fitting_method='geometric')
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.add_selection(0, 121, 109)
+    assert not pb.warm_start
+
+    cells = list(pb.iter_fit_cells())
+    assert len(cells) == 3
+    for cell in cells:
+        ellipse = pybud.Ellipse(cell.found_x[cell.pixel_found], cell.found_y[cell.pixel_found], method='geometric')
+        assert cell.angle == ellipse.get_angle()
+
+if __name__ == "__main__":
+    test_iter_fit_cells()
+    test_geometric_angles_are_cold_fits()
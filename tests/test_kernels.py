@@ -0,0 +1,65 @@
+import pybud
+import numpy as np
+import pytest
+from pybud.edge import annulus_start, cast_rays
+from pybud.kernels import resolve_backend
+from pybud.synthetic import synthetic_stack
+from tests.test_edge import make_stack
+
+def test_resolve_backend():
+    assert resolve_backend('numpy') == 'numpy'
+    assert resolve_backend('auto') in ['numpy', 'numba']
+    with pytest.raises(ValueError):
+        resolve_backend('cuda')
+
+def test_numba_ray_search_matches_numpy():
+    pytest.importorskip("numba")
+    img = make_stack()
+    rng = np.random.default_rng(1)
+    x = np.concatenate([[120, 118.6, 3, 250, -5], rng.random(20) * 260])
+    y = np.concatenate([[110, 111.4, 4, 230, 300], rng.random(20) * 240])
+
+    for cell_radius, edge_size, edge_rel_min in [(62, 16, 8), (10, 4, 30), (8, 12, 8)]:
+        expected = cast_rays(img[0, 0], x, y, cell_radius, edge_size, edge_rel_min, 1000.0)
+        rays = cast_rays(img[0, 0], x, y, cell_radius, edge_size, edge_rel_min, 1000.0, backend='numba')
+        for name, values in expected.items():
+            assert np.array_equal(rays[name], values), name
+
+    # only a band around a previous ellipse
+    start, length, valid = annulus_start(np.tile([120, 110, 30, 22, 0.4], (2, 1)), [120, 118.6], [110, 111.4], 62, 16, 3)
+    assert np.all(valid)
+    expected = cast_rays(img[0, 0], [120, 118.6], [110, 111.4], 62, 16, 8, 1000.0, start, length)
+    rays = cast_rays(img[0, 0], [120, 118.6], [110, 111.4], 62, 16, 8, 1000.0, start, length, backend='numba')
+    for name, values in expected.items():
+        assert np.array_equal(rays[name], values), name
+
+def test_numba_mask_matches_numpy():
+    pytest.importorskip("numba")
+    for params in [(120, 110, 30, 22, 0.4), (3.5, 4.2, 12, 7, -1.1), (255, 100, 40, 40, 0), (130.3, 238.9, 9.5, 3.2, 2.0)]:
+        ellipse = pybud.Ellipse.from_params(np.zeros(5), np.zeros(5), np.array(params), method='algebraic')
+        expected = ellipse.get_mask_indices(240, 260)
+        rows, cols = ellipse.get_mask_indices(240, 260, backend='numba')
+        assert len(rows) > 0
+        assert np.array_equal(rows, expected[0]) and np.array_equal(cols, expected[1])
+
+@pytest.mark.parametrize("order", ["track", "frame"])
+def test_numba_fit_cells_matches_numpy(order):
+    pytest.importorskip("numba")
+    img, cells = synthetic_stack(frames=4, height=256, width=256, n_cells=6, seed=3)
+
+    results = {}
+    for backend in ['numpy', 'numba']:
+        pb = pybud.PyBud()
+        pb.img = img
+        pb.backend = backend
+        pb.incremental_tracking = True
+        pb.add_selections(0, cells[0, :, :2])
+        pb.add_selection(0, 2, 3)
+        pb.fit_cells(order)
+        results[backend] = pb.results
+
+    assert len(results['numba']) == len(results['numpy']) > 0
+    for name, _ in results['numpy'].COLUMNS:
+        assert np.array_equal(results['numba'][name], results['numpy'][name], equal_nan=True), name
+    for name in results['numpy'].CHANNEL_COLUMNS + ['fl_percentiles']:
+        assert np.array_equal(results['numba'][name], results['numpy'][name], equal_nan=True), name
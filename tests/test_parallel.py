@@ -0,0 +1,28 @@
+import pybud
+import numpy as np
+from tests.test_edge import make_stack
+
+def fit(img, max_workers):
+    pb = pybud.PyBud()
+    pb.img = img
+    pb.edge_rel_min = 8
+    pb.max_workers = max_workers
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(0, 30, 200)
+    pb.add_selection(1, 121, 109)
+    pb.fit_cells()
+    return pb.cells
+
+def test_parallel_fit_cells_matches_serial():
+    img = np.repeat(make_stack(), 3, axis=0)
+
+    serial = fit(img, 1)
+    parallel = fit(img, 2)
+
+    assert [(cell.id, cell.frame) for cell in serial] == [(cell.id, cell.frame) for cell in parallel]
+    assert [cell.x_centroid for cell in serial] == [cell.x_centroid for cell in parallel]
+    assert [cell.fluorescence[0].mean for cell in serial] == [cell.fluorescence[0].mean for cell in parallel]
+    assert all(cell.img is img for cell in parallel)
+
+if __name__ == "__main__":
+    test_parallel_fit_cells_matches_serial()
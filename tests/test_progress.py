@@ -0,0 +1,66 @@
+import pybud
+import numpy as np
+import pytest
+from tests.test_edge import make_stack
+
+def create_pybud():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 4, axis=0)
+    pb.edge_rel_min = 8
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(1, 121, 109)
+    pb.add_selection(0, 3, 4)
+    return pb
+
+@pytest.mark.parametrize("order", ["track", "frame"])
+def test_progress(order):
+    pb = create_pybud()
+    reports = []
+    pb.fit_cells(order, progress=lambda done, total: reports.append((done, total)))
+
+    # 4 + 3 + 4 track frames, the corner seed is lost in its first frame
+    assert len(pb.results) == 7
+    assert all(total == 11 for _, total in reports)
+    done = [done for done, _ in reports]
+    assert done == sorted(done) and done[-1] == 11
+
+@pytest.mark.parametrize("order", ["track", "frame"])
+def test_cancel(order):
+    reference = create_pybud()
+    reference.fit_cells(order)
+
+    # cancel after the third progress report
+    pb = create_pybud()
+    reports = []
+    pb.fit_cells(order, progress=lambda done, total: reports.append(done), cancel=lambda: len(reports) >= 3)
+
+    assert pb.progress.cancelled
+    assert pb.progress.done < pb.progress.total
+    assert 0 < len(pb.results) < len(reference.results)
+
+    # the partial results are the first rows of the full run
+    for name in ['cell_id', 'frame', 'x_center', 'major']:
+        assert np.allclose(pb.results[name], reference.results[name][:len(pb.results)])
+
+def test_cancel_parallel():
+    pb = create_pybud()
+    pb.max_workers = 2
+    pb.fit_cells(cancel=lambda: True)
+    assert pb.progress.cancelled
+    assert len(pb.results) == 0
+
+def test_cancel_resume_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.npz")
+    reference = create_pybud()
+    reference.fit_cells()
+
+    pb = create_pybud()
+    pb.checkpoint_interval = 0
+    reports = []
+    pb.fit_cells(checkpoint=path, progress=lambda done, total: reports.append(done), cancel=lambda: len(reports) >= 2)
+    cancelled = len(pb.results)
+
+    resumed = create_pybud()
+    resumed.fit_cells(checkpoint=path)
+    assert len(resumed.cells) == len(reference.results) - cancelled
+    assert sorted(zip(resumed.results['cell_id'], resumed.results['frame'])) == sorted(zip(reference.results['cell_id'], reference.results['frame']))
@@ -0,0 +1,51 @@
+import pybud
+import numpy as np
+from tests.test_edge import make_stack
+
+def test_result_table():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.keep_diagnostics = True
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(1, 121, 109)
+    pb.fit_cells()
+
+    results = pb.results
+    assert len(results) == len(pb.cells) == 5
+    assert list(results['cell_id']) == [cell.id for cell in pb.cells]
+    assert np.array_equal(results['x_centroid'], [cell.x_centroid for cell in pb.cells])
+    assert np.array_equal(results['fl_mean'][:, 0], [cell.fluorescence[0].mean for cell in pb.cells])
+    assert np.array_equal(results['pixel_found'][2], pb.cells[2].pixel_found)
+
+    assert list(results.rows_for_frame(1)) == [1, 3]
+    assert list(results.rows_for_cell(2)) == [3, 4]
+    assert len(results.rows_for_frame(7)) == 0
+    assert results.row(-1)['frame'] == 2
+
+    pb.keep_cells = False
+    pb.keep_diagnostics = False
+    pb.fit_cells()
+    assert pb.cells == [] and len(pb.results) == 5 and 'pixel_found' not in pb.results
+
+def test_result_table_grows():
+    table = pybud.ResultTable([], capacity=1)
+
+    class FakeCell:
+        fl_channels = []
+        fluorescence = []
+        ellipse = pybud.Ellipse([0, 10, 0, -10, 7, -7], [5, 0, -5, 0, 3.5, -3.5], method='geometric')
+        x_selected = y_selected = x_centroid = y_centroid = major = minor = angle = volume = edge_width = 1.0
+
+    for i in range(100):
+        cell = FakeCell()
+        cell.id, cell.frame = i % 7, i
+        table.append_cell(cell)
+
+    assert len(table) == 100
+    assert list(table['frame']) == list(range(100))
+    assert list(table.rows_for_cell(3)) == list(range(3, 100, 7))
+
+if __name__ == "__main__":
+    test_result_table()
+    test_result_table_grows()
@@ -0,0 +1,54 @@
+import numpy as np
+import roifile
+import pybud
+from pybud.rois import ellipse_polygons, read_point_rois, write_ellipse_rois
+from tests.test_edge import make_stack
+
+def test_ellipse_polygons():
+    params = np.array([[120, 110, 30, 22, 0.4], [50.5, 60.2, 10, 14, -1.2], [80, 90, 12, 12, 3.0]])
+    ellipses = [pybud.Ellipse.from_params([], [], p) for p in params]
+
+    polygons = ellipse_polygons([e.get_x_center() for e in ellipses], [e.get_y_center() for e in ellipses],
+                                [e.get_major() for e in ellipses], [e.get_minor() for e in ellipses],
+                                [e.get_angle() for e in ellipses], 50)
+    assert polygons.shape == (3, 50, 2)
+    for polygon, ellipse in zip(polygons, ellipses):
+        x, y = ellipse.generate_ellipse_points(50)
+        assert np.allclose(polygon[:, 0], x) and np.allclose(polygon[:, 1], y)
+
+def test_write_ellipse_rois(tmp_path):
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.add_selection(0, 120, 110)
+    pb.fit_cells()
+
+    path = str(tmp_path / "rois.zip")
+    assert write_ellipse_rois(pb.results, path, pb.fitting_method) == 3
+
+    rois = roifile.roiread(path)
+    assert [roi.t_position for roi in rois] == [1, 2, 3]
+    assert [roi.name for roi in rois] == ["0_cell1_algebraic", "1_cell1_algebraic", "2_cell1_algebraic"]
+    assert rois[0].roitype == roifile.ROI_TYPE.POLYGON
+
+    x, y = pb.cells[0].ellipse.generate_ellipse_points(100)
+    assert np.allclose(rois[0].coordinates(), np.column_stack((x, y)), atol=1e-3)
+
+def test_import_point_rois():
+    frames, coordinates = read_point_rois('tests/cell_points.zip')
+    assert frames.tolist() == [0, 0, 0, 18]
+    assert coordinates.tolist()[:2] == [[88.5, 91.0], [117.0, 150.0]]
+
+    pb = pybud.PyBud()
+    assert pb.import_selections('tests/cell_points.zip') == 4
+    assert pb.selections.count() == 4
+    assert np.array_equal(pb.selections[18], [[182.0, 132.5]])
+
+    # points close to existing selections are skipped
+    assert pb.import_selections('tests/cell_points.zip') == 0
+    assert pb.import_selections('tests/cell_points.zip', deduplicate=False) == 4
+    assert pb.selections.count() == 8
+
+if __name__ == "__main__":
+    test_ellipse_polygons()
+    test_import_point_rois()
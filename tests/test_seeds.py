@@ -0,0 +1,43 @@
+import pybud
+import numpy as np
+
+def make_field(n=4, spacing=60):
+    # brightfield image with a grid of cells, each with a dark rim and a bright halo
+    rng = np.random.default_rng(0)
+    height, width = n * spacing + 40, n * spacing + 40
+    y, x = np.mgrid[:height, :width]
+    img = np.full((1, 1, height, width), 1000.0)
+    centers = []
+
+    for i in range(n):
+        for j in range(n):
+            cx, cy, angle = 50 + spacing * i, 50 + spacing * j, 0.4 * (i + j)
+            x_rot = (x - cx) * np.cos(angle) + (y - cy) * np.sin(angle)
+            y_rot = -(x - cx) * np.sin(angle) + (y - cy) * np.cos(angle)
+            r = np.sqrt((x_rot / (20 + 2 * i)) ** 2 + (y_rot / 16) ** 2)
+            img[0, 0] += -600 * (np.abs(r - 1) < 0.08) + 500 * (np.abs(r - 1.12) < 0.06)
+            centers.append((cx, cy))
+
+    img += rng.normal(0, 30, img.shape)
+    return img.astype(np.uint16), np.array(centers)
+
+def test_detect_seeds():
+    img, centers = make_field()
+    seeds = pybud.seeds.detect_seeds(img[0, 0], 62)
+
+    # one seed close to the center of every cell
+    assert len(seeds) == len(centers)
+    distance = np.hypot(seeds[:, np.newaxis, 0] - centers[:, 0], seeds[:, np.newaxis, 1] - centers[:, 1])
+    assert np.all(np.min(distance, axis=1) < 5)
+    assert len(set(np.argmin(distance, axis=1))) == len(centers)
+
+    assert len(pybud.seeds.detect_seeds(np.full((100, 100), 1000), 62)) == 0
+
+    pb = pybud.PyBud()
+    pb.img = img
+    assert pb.add_detected_seeds(0) == len(centers)
+    assert pb.add_detected_seeds(0) == 0
+    assert len(pb.selections[0]) == len(centers)
+
+if __name__ == "__main__":
+    test_detect_seeds()
@@ -0,0 +1,69 @@
+import pybud
+import numpy as np
+
+def test_selections():
+    pb = pybud.PyBud(selection_radius=10)
+    pb.add_selection(3, 100, 100)
+    pb.add_selection(0, 20, 20)
+    pb.add_selection(0, 50, 50)
+
+    # the dictionary interface of the original lists
+    assert list(pb.selections.keys()) == [3, 0]
+    assert [(frame, len(coordinates)) for frame, coordinates in pb.selections.items()] == [(3, 1), (0, 2)]
+    assert [(x, y) for x, y in pb.selections[0]] == [(20, 20), (50, 50)]
+    assert 0 in pb.selections and 1 not in pb.selections
+    assert pb.get_tracks() == [(1, 3, 100.0, 100.0), (2, 0, 20.0, 20.0), (3, 0, 50.0, 50.0)]
+
+    assert pb.contains_selection(0, 26, 28) and not pb.contains_selection(0, 30, 30) and not pb.contains_selection(1, 20, 20)
+    assert pb.remove_selection(0, 26, 28) and not pb.remove_selection(0, 26, 28)
+    assert pb.selections[0].tolist() == [[50, 50]]
+
+    # bulk operations skip coordinates close to existing selections and to each other
+    assert pb.add_selections(0, [(52, 52), (80, 80), (85, 85), (200, 200)]) == 2
+    assert pb.selections[0].tolist() == [[50, 50], [80, 80], [200, 200]]
+    assert list(pb.find_selections(0, 70, 70, radius=30)) == [0, 1]
+    assert [list(found) for found in pb.find_selections(0, [79, 0], [79, 0])] == [[1], []]
+    assert pb.nearest_selection(0, 190, 195) == (2, np.hypot(10, 5))
+    assert pb.nearest_selection(7, 0, 0)[0] == -1
+
+    assert pb.remove_selections(0, [(50, 50), (200, 195)]) == 2
+    assert pb.selections[0].tolist() == [[80, 80]]
+
+    # many selections, checked against a brute force search
+    rng = np.random.default_rng(0)
+    points = rng.random((2000, 2)) * 1000
+    pb.selections.add(5, points)
+    queries = rng.random((200, 2)) * 1000
+    for (x, y), found in zip(queries, pb.find_selections(5, queries[:, 0], queries[:, 1], radius=25)):
+        assert list(found) == list(np.flatnonzero(np.hypot(points[:, 0] - x, points[:, 1] - y) <= 25))
+
+    pb.clear()
+    assert len(pb.selections) == 0 and pb.get_tracks() == []
+
+def test_interleaved_clicks():
+    # single clicks between queries, checked against a brute force search of the selections
+    pb = pybud.PyBud(selection_radius=10)
+    rng = np.random.default_rng(1)
+    pb.selections.add(0, rng.random((3000, 2)) * 1000)
+    expected = pb.selections[0].tolist()
+
+    for x, y in rng.random((1500, 2)) * 1000:
+        close = [i for i, (px, py) in enumerate(expected) if np.hypot(px - x, py - y) <= 10]
+        assert pb.contains_selection(0, x, y) == bool(close)
+        assert list(pb.find_selections(0, x, y)) == close
+
+        if close:
+            assert pb.remove_selection(0, x, y)
+            del expected[close[0]]
+        else:
+            pb.add_selection(0, x, y)
+            expected.append([x, y])
+        assert pb.selections[0].tolist() == expected
+
+    index, distance = pb.nearest_selection(0, 500, 500)
+    distances = np.hypot(np.array(expected)[:, 0] - 500, np.array(expected)[:, 1] - 500)
+    assert index == np.argmin(distances) and distance == distances.min()
+
+if __name__ == "__main__":
+    test_selections()
+    test_interleaved_clicks()
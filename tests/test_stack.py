@@ -0,0 +1,29 @@
+import pybud
+import pickle
+import numpy as np
+import tifffile
+
+def test_tiff_stack(tmp_path):
+    img = np.random.default_rng(0).integers(0, 4096, (3, 2, 40, 50)).astype(np.uint16)
+    tifffile.imwrite(tmp_path / "plain.tif", img, imagej=True)
+    tifffile.imwrite(tmp_path / "compressed.tif", img, imagej=True, compression='zlib')
+    tifffile.imwrite(tmp_path / "single.tif", img[:, 0], imagej=True, compression='zlib')
+
+    plain = pybud.open_stack(tmp_path / "plain.tif")
+    compressed = pybud.open_stack(tmp_path / "compressed.tif")
+    assert plain.is_memory_mapped() and not compressed.is_memory_mapped()
+
+    for stack in [plain, compressed, pickle.loads(pickle.dumps(compressed))]:
+        assert stack.shape == img.shape
+        assert np.array_equal(stack[1, 0], img[1, 0])
+        assert np.array_equal(stack[2, 1, 5, 7], img[2, 1, 5, 7])
+        assert np.array_equal(stack[:, 1], img[:, 1])
+        assert np.array_equal(stack[0, np.array([[1], [0]]), np.array([3, 4]), np.array([5, 6])], img[0, np.array([[1], [0]]), np.array([3, 4]), np.array([5, 6])])
+
+    single = pybud.open_stack(tmp_path / "single.tif")
+    assert single.shape == (3, 1, 40, 50)
+    assert np.array_equal(single[2, 0], img[2, 0])
+
+    pb = pybud.PyBud()
+    pb.img = img[:, 0]
+    assert pb.img.shape == (3, 1, 40, 50) and np.shares_memory(pb.img, img)
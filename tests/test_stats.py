@@ -0,0 +1,59 @@
+import pybud
+import numpy as np
+import pytest
+from pybud.stats import RAY_COUNTS, STAGES
+from tests.test_edge import make_stack
+
+def create_pybud():
+    pb = pybud.PyBud()
+    pb.img = np.repeat(make_stack(), 3, axis=0)
+    pb.edge_rel_min = 8
+    pb.instrument = True
+    pb.add_selection(0, 120, 110)
+    pb.add_selection(0, 3, 4)
+    return pb
+
+@pytest.mark.parametrize("order", ["track", "frame"])
+def test_run_statistics(order):
+    pb = create_pybud()
+    stopped = []
+    pb.statistics_callback = lambda statistics: stopped.append(len(statistics.terminations))
+
+    statistics = pb.fit_cells(order)
+
+    assert statistics is pb.statistics
+    assert statistics.cells == len(pb.cells) == 3
+    assert stopped == [1, 2]
+
+    reasons = [reason for _, reason in statistics.terminations.values()]
+    assert sorted(reasons) == ['end_of_stack', 'too_few_rays']
+    assert statistics.termination_counts()['end_of_stack'] == 1
+
+    # every filter only removes rays, three frames of the cell and the corner seed cast 360 rays each
+    counts = [statistics.rays[name] for name in RAY_COUNTS]
+    assert counts == sorted(counts, reverse=True)
+    assert statistics.rays['cast'] == 4 * 360
+    assert statistics.rays['accepted'] >= 3 * 150
+
+    for stage in STAGES:
+        assert statistics.timers[stage] > 0, stage
+    assert statistics.wall_time >= statistics.timers['ellipse_fit']
+    assert "track terminations" in str(statistics)
+
+def test_fit_error_ends_track(monkeypatch):
+    pb = create_pybud()
+    pb.fitting_method = 'geometric'
+
+    def failing_ellipse(*args, **kwargs):
+        raise ValueError("not an ellipse")
+    monkeypatch.setattr(pybud.cell, 'Ellipse', failing_ellipse)
+
+    statistics = pb.fit_cells()
+    assert len(pb.cells) == 0
+    assert sorted(reason for _, reason in statistics.terminations.values()) == ['fit_error', 'too_few_rays']
+
+def test_statistics_off_by_default():
+    pb = create_pybud()
+    pb.instrument = False
+    assert pb.fit_cells() is None
+    assert len(pb.cells) == 3
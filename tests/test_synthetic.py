@@ -0,0 +1,29 @@
+import pybud
+import numpy as np
+from pybud.synthetic import synthetic_stack
+
+def test_synthetic_stack():
+    img, cells = synthetic_stack(frames=3, channels=2, height=256, width=300, n_cells=4, seed=3)
+    assert img.shape == (3, 2, 256, 300) and img.dtype == np.uint16
+    assert cells.shape == (3, 4, 5)
+    assert np.all(cells[..., 2] >= cells[..., 3])
+
+    # the same seed gives the same stack
+    again, _ = synthetic_stack(frames=3, channels=2, height=256, width=300, n_cells=4, seed=3)
+    assert np.array_equal(img, again)
+
+    # the cells are found where they were drawn
+    pb = pybud.PyBud()
+    pb.img = img
+    pb.add_selections(0, cells[0, :, :2])
+    pb.fit_cells()
+
+    results = pb.results
+    assert len(results) == 3 * 4
+    truth = cells[results['frame'], results['cell_id'] - 1]
+    assert np.allclose(results['x_center'], truth[:, 0], atol=1)
+    assert np.allclose(results['y_center'], truth[:, 1], atol=1)
+    assert np.allclose(results['major_axis'], truth[:, 2], atol=3)
+
+if __name__ == "__main__":
+    test_synthetic_stack()